@@ -0,0 +1,94 @@
+"""Routing accuracy and per-query routing cost for the intent router.
+
+Run: python bench_intents.py [--iterations N]
+"""
+import argparse
+import sys
+import time
+from intents import kai_router
+
+# (query, expected intent, expected slots)
+CORPUS = [
+    ("exit", "exit", {}),
+    ("Kai quit", "exit", {}),
+    ("stop", "exit", {}),
+    ("stop the music", "chat", {}),
+    ("write a python program for factorial", "code", {"language": "python"}),
+    ("Write a java program to reverse a string and a c++ program for bubble sort", "code", {"language": "java"}),
+    ("write a javascript program that opens a new tab", "code", {"language": "javascript"}),
+    ("can you write a c program for fibonacci", "code", {"language": "c"}),
+    ("write a c++ program for binary search", "code", {"language": "c++"}),
+    ("write a movie script about dragons", "chat", {}),
+    ("write a script for my youtube video", "chat", {}),
+    ("create a code of conduct for my team", "chat", {}),
+    ("play music", "music", {}),
+    ("open music", "music", {}),
+    ("please play some songs", "music", {}),
+    ("open youtube", "open", {"site": "youtube"}),
+    ("Kai, open github", "open", {"site": "github"}),
+    ("can you open stack overflow", "open", {"site": "stack overflow"}),
+    ("what are the opening hours of the library", "chat", {}),
+    ("is the museum open on sunday", "chat", {}),
+    ("what's the weather in Paris", "weather", {"city": "paris"}),
+    ("temperature in new york today", "weather", {"city": "new york"}),
+    ("weather in new york tomorrow", "weather", {"city": "new york"}),
+    ("what's the weather in delhi this week?", "weather", {"city": "delhi"}),
+    ("weather in san francisco tomorrow morning please", "weather", {"city": "san francisco"}),
+    ("what is the weather like", "weather", {}),
+    ("what time is it", "time", {}),
+    ("tell me the time", "time", {}),
+    ("time", "time", {}),
+    ("what is the time now", "time", {}),
+    ("Kai, what's the time?", "time", {}),
+    ("what is the time complexity of quicksort", "chat", {}),
+    ("what is the time zone of tokyo", "chat", {}),
+    ("sometimes I feel tired", "chat", {}),
+    ("how do I manage my time better", "chat", {}),
+    ("what's today's date", "date", {}),
+    ("what is the date", "date", {}),
+    ("what is the date today", "date", {}),
+    ("what day is it today?", "date", {}),
+    ("what is the date of the next election", "search", {}),
+    ("what is the date format in java", "chat", {}),
+    ("how do I update pip", "chat", {}),
+    ("what is the best date idea", "chat", {}),
+    ("latest news about the stock market", "search", {}),
+    ("who won the match yesterday", "search", {}),
+    ("what happened in the world today", "search", {}),
+    ("what is recursion", "chat", {}),
+    ("explain the renewal process for a passport", "chat", {}),
+    ("tell me a joke", "chat", {}),
+    ("format this paragraph nicely", "chat", {}),
+]
+
+
+def accuracy():
+    misses = []
+    for query, intent, slots in CORPUS:
+        match = kai_router.classify(query)
+        if match.intent != intent or any(match.slots.get(k) != v for k, v in slots.items()):
+            misses.append((query, intent, slots, match))
+    return misses
+
+
+def routing_cost(iterations):
+    queries = [query for query, _, _ in CORPUS]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for query in queries:
+            kai_router.classify(query)
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(queries))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    misses = accuracy()
+    for query, intent, slots, match in misses:
+        print(f"MISROUTED {query!r}: expected {intent} {slots}, got {match}")
+    print(f"Accuracy: {len(CORPUS) - len(misses)}/{len(CORPUS)}")
+    print(f"Routing cost: {routing_cost(args.iterations) * 1e6:.1f} us/query")
+    sys.exit(1 if misses else 0)
@@ -0,0 +1,468 @@
+"""Offline benchmark: Kai's query paths against local stand-ins for every external service.
+
+Gemini and Mistral are replaced by FakeProvider (configurable latency, jitter and failure
+rate), SerpAPI and OpenWeatherMap by a local HTTP stub server, and the TTS service and the
+microphone by fakes. Scripted workloads run through main(), generate_code and search_web
+and report p50/p95/p99 latency, throughput and peak RSS; no network access or API keys
+are needed. Exits non-zero when, at --failure-rate 0, any request ends in an apology
+(the failover workload makes Gemini fail every call, so Mistral has to answer them all),
+or when a p95 is over --max-p95-ms.
+
+Run: python bench_offline.py [--workload chat,mixed,...] [--requests N] [--concurrency N]
+                             [--latency S] [--jitter S] [--failure-rate P] [--json]
+"""
+import argparse
+import array
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import main as kai
+from cache import ResponseCache
+from memory import ConversationMemory
+from providers import Provider, ProviderRouter, ProviderStats
+from search import SearchClient
+from tracing import tracer
+from voice import VoiceCapture, FRAME_MS, FRAME_SAMPLES, SAMPLE_RATE
+from weather import WeatherClient
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Replies that mean the user got an apology instead of an answer
+FAILURE_REPLIES = (
+    "I'm facing an issue",
+    "I'm having trouble retrieving",
+    "I am unable to retrieve",
+    "Sorry, I couldn't generate",
+    "Error:",
+)
+
+CODE_REPLY = "```python\ndef {name}(n):\n    return n\n```"
+
+
+class FakeProvider(Provider):
+    """Stand-in chat model: sleeps for latency +/- jitter, fails with probability failure_rate.
+
+    Streams the reply word by word, spreading the latency over the chunks.
+    """
+
+    def __init__(self, name, latency=0.2, jitter=0.05, failure_rate=0.0, seed=None, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    def _delay(self):
+        return max(0.0, self.random.gauss(self.latency, self.jitter))
+
+    def _reply(self, prompt):
+        if "program" in prompt:
+            return CODE_REPLY.format(name="task_" + str(abs(hash(prompt)) % 10000))
+        return f"{self.name} says: this is a short answer. It has two sentences."
+
+    async def _generate(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self._delay())
+        if self.random.random() < self.failure_rate:
+            raise ConnectionError(f"{self.name} stub failure")
+        return self._reply(prompt)
+
+    async def _stream(self, prompt):
+        self.calls += 1
+        words = self._reply(prompt).split(" ")
+        delay = self._delay() / len(words)
+        if self.random.random() < self.failure_rate:
+            await asyncio.sleep(delay)
+            raise ConnectionError(f"{self.name} stub failure")
+        for word in words:
+            await asyncio.sleep(delay)
+            yield word + " "
+
+
+class FakeTTS:
+    """Drop-in for tts.tts that only counts what would have been spoken."""
+
+    enabled = True
+
+    def __init__(self):
+        self.spoken = []
+
+    def speak(self, text, priority=5, interrupt=False, cache=False):
+        self.spoken.append(text)
+
+    def is_speaking(self):
+        return False
+
+    def stop(self):
+        pass
+
+    def warm_up(self):
+        pass
+
+
+class StubServer:
+    """Local HTTP server answering SerpAPI (/search.json) and OpenWeatherMap (/data/2.5/weather)."""
+
+    def __init__(self, latency=0.05, jitter=0.01, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.server = None
+
+    @property
+    def url(self):
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:  # Keep-alive: the clients pool their connections
+                request_line = (await reader.readline()).decode("latin-1")
+                if not request_line:
+                    return
+                while (await reader.readline()).strip():
+                    pass
+                self.requests += 1
+                path = request_line.split()[1]
+                await asyncio.sleep(max(0.0, self.random.gauss(self.latency, self.jitter)))
+                status, payload = self._answer(path)
+                body = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} Stub\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _answer(self, path):
+        failed = self.random.random() < self.failure_rate
+        if path.startswith("/search.json"):
+            if failed:
+                return 500, {"error": "stub failure"}
+            snippets = [f"Result {i} is a relevant snippet about the topic with a few facts." for i in range(5)]
+            return 200, {"organic_results": [{"snippet": s} for s in snippets]}
+        if path.startswith("/data/2.5/weather"):
+            if failed:
+                return 500, {"cod": "500", "message": "stub failure"}
+            return 200, {"cod": 200, "main": {"temp": 27.5}, "weather": [{"description": "clear sky"}]}
+        return 404, {"error": "not found"}
+
+
+class FakeMicrophone:
+    """Serves a scripted 16 kHz stream (noise, then tone bursts as "speech") through .stream.read()."""
+
+    def __init__(self, utterances, speech_ms=900, gap_ms=1200, speed=10.0):
+        self.stream = self
+        self.frame_delay = FRAME_MS / 1000 / speed
+        self.frames = []
+        self.speech_ended = {}  # frame index after each utterance's last voiced frame -> utterance no.
+        silence = self._frame(60)
+        self.frames += [silence] * (1000 // FRAME_MS)  # Calibration
+        for n in range(utterances):
+            self.frames += [self._frame(4000, tone=True)] * (speech_ms // FRAME_MS)
+            self.speech_ended[len(self.frames)] = n
+            self.frames += [silence] * (gap_ms // FRAME_MS)
+        self.position = 0
+        self.ended_at = {}  # utterance no. -> perf_counter when its speech ended
+
+    @staticmethod
+    def _frame(amplitude, tone=False):
+        rng = random.Random(amplitude)
+        samples = [
+            int(amplitude * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE)) if tone else rng.randint(-amplitude, amplitude)
+            for i in range(FRAME_SAMPLES)
+        ]
+        return array.array("h", samples).tobytes()
+
+    @property
+    def done(self):
+        return self.position >= len(self.frames)
+
+    def read(self, samples):
+        time.sleep(self.frame_delay)
+        if self.done:
+            return self.frames[0]
+        if self.position in self.speech_ended:
+            self.ended_at[self.speech_ended[self.position]] = time.perf_counter()
+        frame = self.frames[self.position]
+        self.position += 1
+        return frame
+
+
+class FakeSpeechBackend:
+    """Recognizer stand-in: returns "utterance N" after a fixed recognition delay."""
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.count = 0
+
+    def start(self):
+        pass
+
+    def accept(self, frame):
+        return None
+
+    def finish(self):
+        time.sleep(self.delay)
+        text = f"utterance {self.count}"
+        self.count += 1
+        return text
+
+
+def install(args, gemini_failure_rate=None):
+    """Point main's module-level clients at fresh fakes; returns (fake_tts, stub_server)."""
+    gemini_failure = args.failure_rate if gemini_failure_rate is None else gemini_failure_rate
+    kai.gemini = FakeProvider("gemini", args.latency, args.jitter, gemini_failure, seed=1)
+    kai.mistral = FakeProvider("mistral", args.latency * 1.5, args.jitter, args.failure_rate, seed=2)
+    kai.ai_router = ProviderRouter([kai.gemini, kai.mistral], hedge=args.hedge, on_failover=kai.announce_failover)
+    kai.response_cache = ResponseCache(max_entries=512)
+    kai.memory = ConversationMemory(token_budget=1500, summarizer=kai.summarize_history)
+    kai.tts = FakeTTS()
+    kai.DESKTOP_ACTIONS = False
+    return kai.tts
+
+
+def percentile_ms(stats, pct):
+    value = stats.percentile(pct)
+    return None if value is None else round(value * 1000, 1)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (None where it can't be read)."""
+    if resource is None:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return round(psutil.Process().memory_info().peak_wset / 2**20, 1)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+async def measure(calls, concurrency):
+    """Run the coroutine factories under a concurrency limit; returns (stats, failures, elapsed)."""
+    limit = asyncio.Semaphore(concurrency)
+    stats = ProviderStats(window=len(calls) or 1)
+    failures = []
+
+    async def one(call):
+        async with limit:
+            start = time.perf_counter()
+            error = None
+            try:
+                reply = await call()
+                if isinstance(reply, str) and reply.startswith(FAILURE_REPLIES):
+                    error = RuntimeError(reply)
+            except Exception as e:
+                error = e
+            stats.record(time.perf_counter() - start, error)
+            if error is not None:
+                failures.append(str(error))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(call) for call in calls))
+    return stats, failures, time.perf_counter() - start
+
+
+async def workload_chat(args):
+    queries = [f"tell me something interesting about topic {i}" for i in range(args.requests)]
+    # Every other query streams, like the GUI does
+    return await measure([
+        (lambda q=q, i=i: kai.main(q, on_token=(lambda token: None) if i % 2 else None))
+        for i, q in enumerate(queries)
+    ], args.concurrency)
+
+
+async def workload_mixed(args):
+    templates = [
+        "explain idea number {i}",
+        "what's the weather in city{c}",
+        "latest news about team {i}",
+        "what time is it",
+        "what's today's date",
+        "open site{c}",
+    ]
+    return await measure([
+        (lambda q=templates[i % len(templates)].format(i=i, c=i % 8): kai.main(q))
+        for i in range(args.requests)
+    ], args.concurrency)
+
+
+async def workload_search(args):
+    return await measure([
+        (lambda i=i: kai.search_web(f"latest news about subject {i}", summarize="skip" if i % 2 else "model"))
+        for i in range(args.requests)
+    ], args.concurrency)
+
+
+async def workload_code(args):
+    # Three programs per request, generated concurrently by generate_code
+    return await measure([
+        (lambda i=i: kai.generate_code(
+            f"write a python program for sorting {i} and a python program for searching {i} "
+            f"and a python program for parsing {i}"
+        ))
+        for i in range(max(1, args.requests // 4))
+    ], args.concurrency)
+
+
+async def workload_failover(args):
+    # Gemini always fails (see WORKLOADS); every answer has to come from Mistral
+    return await measure([(lambda i=i: kai.main(f"describe failover case {i}")) for i in range(args.requests)], args.concurrency)
+
+
+async def workload_voice(args):
+    """End of speech -> transcript latency through VoiceCapture's VAD and recognition threads."""
+    utterances = max(1, args.requests // 8)
+    microphone = FakeMicrophone(utterances, speed=args.mic_speed)
+    transcripts = []
+    finished = threading.Event()
+
+    def on_transcript(text):
+        transcripts.append((text, time.perf_counter()))
+        if len(transcripts) == utterances:
+            finished.set()
+
+    capture = VoiceCapture(on_transcript, on_status=lambda message: None)
+    capture.backend = FakeSpeechBackend()
+    capture.vad.webrtc = None  # The synthetic tones are loud, not speech-like
+    capture._source = microphone
+    start = time.perf_counter()
+    capture.start()
+    await asyncio.get_running_loop().run_in_executor(None, finished.wait, 60.0)
+    capture.stop()
+    elapsed = time.perf_counter() - start
+
+    stats = ProviderStats(window=utterances)
+    for n in range(utterances):
+        if n < len(transcripts):
+            stats.record(transcripts[n][1] - microphone.ended_at[n])
+        else:
+            stats.record(0.0, TimeoutError())
+    failures = [f"utterance {n} was never transcribed" for n in range(len(transcripts), utterances)]
+    return stats, failures, elapsed
+
+
+# name -> (workload, Gemini failure rate override)
+WORKLOADS = {
+    "chat": (workload_chat, None),
+    "mixed": (workload_mixed, None),
+    "search": (workload_search, None),
+    "code": (workload_code, None),
+    "failover": (workload_failover, 1.0),
+    "voice": (workload_voice, None),
+}
+
+
+async def run(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as outputs:
+        cwd = os.getcwd()
+        os.chdir(outputs)  # generate_code saves its files in the working directory
+        try:
+            for name in args.workload:
+                factory, gemini_failure_rate = WORKLOADS[name]
+                fake_tts = install(args, gemini_failure_rate)
+                stub = await StubServer(args.api_latency, args.jitter / 4, args.failure_rate, seed=3).start()
+                kai.weather_client = WeatherClient("stub", base_url=stub.url)
+                kai.search_client = SearchClient("stub", base_url=stub.url)
+                try:
+                    stats, failures, elapsed = await factory(args)
+                finally:
+                    await kai.close_clients()
+                    await stub.stop()
+
+                results[name] = {
+                    "requests": stats.requests,
+                    "failures": len(failures),
+                    "p50_ms": percentile_ms(stats, 50),
+                    "p95_ms": percentile_ms(stats, 95),
+                    "p99_ms": percentile_ms(stats, 99),
+                    "throughput_qps": round(stats.requests / elapsed, 2) if elapsed else None,
+                    "peak_rss_mb": peak_rss_mb(),
+                    "provider_calls": {"gemini": kai.gemini.calls, "mistral": kai.mistral.calls},
+                    "stub_requests": stub.requests,
+                    "spoken": len(fake_tts.spoken),
+                    "sample_failures": failures[:3],
+                }
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def regressions(results, args):
+    problems = []
+    for name, result in results.items():
+        if args.failure_rate == 0 and result["failures"]:
+            problems.append(f"{name}: {result['failures']} failed requests, e.g. {result['sample_failures'][0]}")
+        if args.max_p95_ms and result["p95_ms"] and result["p95_ms"] > args.max_p95_ms:
+            problems.append(f"{name}: p95 {result['p95_ms']} ms > {args.max_p95_ms} ms")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", default=",".join(WORKLOADS), help="Comma-separated: " + ", ".join(WORKLOADS))
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean AI provider latency in seconds (Mistral: 1.5x)")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="Mean SerpAPI/OpenWeatherMap stub latency")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--hedge", action="store_true", help="Enable hedged requests in the provider router")
+    parser.add_argument("--mic-speed", type=float, default=10.0, help="Fake microphone speed-up over real time")
+    parser.add_argument("--max-p95-ms", type=float, default=None)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--trace", action="store_true", help="Also print per-stage histograms (Prometheus text)")
+    args = parser.parse_args()
+    args.workload = [name.strip() for name in args.workload.split(",") if name.strip()]
+    unknown = [name for name in args.workload if name not in WORKLOADS]
+    if unknown:
+        parser.error(f"unknown workload(s): {', '.join(unknown)}")
+
+    tracer.enabled = args.trace
+    log = sys.stdout
+    if args.json:
+        sys.stdout = sys.stderr  # Kai's own prints must not corrupt the JSON
+    results = asyncio.run(run(args))
+    sys.stdout = log
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'workload':10} {'reqs':>5} {'fail':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/s':>8} {'RSS MB':>7}")
+        for name, r in results.items():
+            print(
+                f"{name:10} {r['requests']:>5} {r['failures']:>5} {r['p50_ms'] or 0:>8.1f} {r['p95_ms'] or 0:>8.1f} "
+                f"{r['p99_ms'] or 0:>8.1f} {r['throughput_qps'] or 0:>8.2f} {r['peak_rss_mb'] or 0:>7.1f}"
+            )
+    if args.trace:
+        print(tracer.registry.to_prometheus())
+    problems = regressions(results, args)
+    for problem in problems:
+        print(f"REGRESSION: {problem}")
+    sys.exit(1 if problems else 0)
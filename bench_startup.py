@@ -0,0 +1,109 @@
+"""Startup benchmark: `-X importtime` breakdown of `import main` plus time-to-window for the GUI.
+
+Exits non-zero when the median import time or time-to-window exceeds its threshold,
+so it can guard against heavy imports creeping back into the startup path.
+
+Run: python bench_startup.py [--runs N] [--max-import-ms MS] [--max-window-ms MS]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+WINDOW_SNIPPET = """
+import gui
+app = gui.KaiGUI()
+app.update()
+print("ready", flush=True)
+app.on_exit()
+"""
+
+
+def import_profile(module):
+    """Run a fresh interpreter with -X importtime; returns [(cumulative_us, self_us, depth, name)]."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cumulative_us), int(self_us), depth, name.strip()))
+    return rows
+
+
+def children(rows, module):
+    """Direct imports of a top-level module (importtime lists a module after its children)."""
+    end = next(i for i, row in enumerate(rows) if row[2] == 0 and row[3] == module)
+    start = end
+    while start > 0 and rows[start - 1][2] > 0:
+        start -= 1
+    return [row for row in rows[start:end] if row[2] == 1]
+
+
+def time_to_window():
+    """Seconds from process start until the first frame of the Kai window is drawn, or None without a display."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", WINDOW_SNIPPET],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    for line in process.stdout:
+        if line.strip() == "ready":
+            elapsed = time.perf_counter() - start
+            process.wait(timeout=10)
+            return elapsed
+    process.wait()
+    print(f"Window benchmark skipped: {process.stderr.read().strip().splitlines()[-1:]}")
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-import-ms", type=float, default=300.0)
+    parser.add_argument("--max-window-ms", type=float, default=2500.0)
+    parser.add_argument("--no-window", action="store_true", help="Skip the GUI time-to-window measurement")
+    args = parser.parse_args()
+
+    totals = []
+    profile = []
+    for _ in range(args.runs):
+        profile = import_profile(args.module)
+        totals.append(next(cum for cum, _, depth, name in profile if depth == 0 and name == args.module) / 1000)
+    import_ms = statistics.median(totals)
+
+    print(f"import {args.module}: median {import_ms:.1f} ms over {args.runs} runs")
+    print(f"Slowest imports under {args.module} (last run):")
+    direct = children(profile, args.module)
+    for cumulative, own, depth, name in sorted(direct, reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  (self {own / 1000:6.1f} ms)  {name}")
+
+    failed = import_ms > args.max_import_ms
+    if failed:
+        print(f"REGRESSION: import time {import_ms:.1f} ms > {args.max_import_ms:.0f} ms")
+
+    if not args.no_window:
+        windows = []
+        for _ in range(args.runs):
+            elapsed = time_to_window()
+            if elapsed is None:
+                break
+            windows.append(elapsed)
+        if windows:
+            window_ms = statistics.median(windows) * 1000
+            print(f"time-to-window: median {window_ms:.0f} ms over {len(windows)} runs")
+            if window_ms > args.max_window_ms:
+                print(f"REGRESSION: time-to-window {window_ms:.0f} ms > {args.max_window_ms:.0f} ms")
+                failed = True
+
+    sys.exit(1 if failed else 0)
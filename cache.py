@@ -0,0 +1,142 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CHAT_CACHE_TTL = 24 * 60 * 60  # General answers and code rarely change
+SEARCH_CACHE_TTL = 5 * 60  # Live results go stale quickly
+
+
+def normalize_prompt(text):
+    """Lower-case, collapse whitespace and drop sentence punctuation so trivial variants share a key."""
+    text = re.sub(r"[.,!?;:'\"`]", " ", text.lower())
+    return " ".join(text.split())
+
+
+class _MemoryStore:
+    def __init__(self):
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, value, expires_at):
+        self.entries[key] = (value, expires_at)
+        self.entries.move_to_end(key)
+
+    def delete(self, key):
+        self.entries.pop(key, None)
+
+    def evict(self, max_entries):
+        while len(self.entries) > max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class _SQLiteStore:
+    """Same interface as _MemoryStore, persisted so the cache survives restarts."""
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, value TEXT, expires_at REAL, last_used REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.db.commit()
+
+    def get(self, key):
+        row = self.db.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self.db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+        return row
+
+    def put(self, key, value, expires_at):
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, value, expires_at, time.time())
+        )
+        self.db.commit()
+
+    def delete(self, key):
+        self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self.db.commit()
+
+    def evict(self, max_entries):
+        self.db.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (max_entries,),
+        )
+        self.db.commit()
+
+    def clear(self):
+        self.db.execute("DELETE FROM responses")
+        self.db.commit()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """Size- and TTL-bounded LRU cache for model replies, keyed on the normalized prompt.
+
+    Pass path to keep entries in SQLite instead of memory.
+    """
+
+    def __init__(self, max_entries=512, ttl=CHAT_CACHE_TTL, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._store = _SQLiteStore(path) if path else _MemoryStore()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(prompt, namespace=""):
+        return f"{namespace}:{normalize_prompt(prompt)}"
+
+    def get(self, prompt, namespace=""):
+        """Return the cached reply or None."""
+        key = self.key(prompt, namespace)
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is not None and entry[1] < time.time():
+                self._store.delete(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def set(self, prompt, value, namespace="", ttl=None):
+        """Store a reply; a ttl of 0 opts the call out of caching."""
+        ttl = self.ttl if ttl is None else ttl
+        if not ttl or not value:
+            return
+        with self._lock:
+            self._store.put(self.key(prompt, namespace), value, time.time() + ttl)
+            self._store.evict(self.max_entries)
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._store),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,105 @@
+import asyncio
+import concurrent.futures
+import threading
+
+
+class KaiEngine:
+    """One long-lived asyncio loop on a worker thread that runs Kai queries."""
+
+    def __init__(self, workers=4):
+        self.loop = asyncio.new_event_loop()
+        self.workers = workers
+        self.on_shutdown = []  # Coroutine functions awaited before the loop stops
+        self._queue = None
+        self._worker_tasks = []
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="kai-engine", daemon=True)
+
+    def start(self):
+        """Start the loop thread and wait until it accepts requests."""
+        if not self._thread.is_alive():
+            self._thread.start()
+            self._ready.wait()
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self._queue = asyncio.Queue()
+        self._worker_tasks = [self.loop.create_task(self._worker()) for _ in range(self.workers)]
+        self.loop.call_soon(self._ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    async def _worker(self):
+        """Pull requests off the queue and run them, honouring cancellation."""
+        while True:
+            coro_fn, args, future = await self._queue.get()
+            try:
+                if future.cancelled():
+                    continue
+
+                task = asyncio.ensure_future(coro_fn(*args))
+                # Cancelling the returned future from any thread cancels the running task
+                future.add_done_callback(
+                    lambda f, t=task: f.cancelled() and self.loop.call_soon_threadsafe(t.cancel)
+                )
+                try:
+                    result = await task
+                except asyncio.CancelledError:
+                    if not future.cancelled():
+                        future.cancel()
+                        raise  # The worker itself is being shut down
+                except Exception as e:
+                    self._set_state(future, exception=e)
+                else:
+                    self._set_state(future, result=result)
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _set_state(future, result=None, exception=None):
+        if future.cancelled():
+            return
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except concurrent.futures.InvalidStateError:
+            pass  # Cancelled from another thread in the meantime
+
+    def submit(self, coro_fn, *args):
+        """Queue coro_fn(*args) on the engine loop; returns a cancellable concurrent Future."""
+        if not self._ready.is_set():
+            self.start()
+        future = concurrent.futures.Future()
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, (coro_fn, args, future))
+        return future
+
+    def run(self, coro_fn, *args, timeout=None):
+        """Blocking helper: submit and wait for the result."""
+        return self.submit(coro_fn, *args).result(timeout)
+
+    async def _shutdown(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        for hook in self.on_shutdown:
+            try:
+                await hook()
+            except Exception as e:
+                print(f"Engine shutdown hook failed: {e}")
+
+    def stop(self, timeout=2.0):
+        """Cancel in-flight work, run shutdown hooks and stop the loop thread."""
+        if not self._thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout)
+        except Exception as e:
+            print(f"Engine shutdown error: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
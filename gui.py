@@ -1,21 +1,45 @@
 import customtkinter as ctk
 import tkinter as tk
+import queue
 import threading
-import asyncio
+import itertools
 import re
-import pyttsx3
-import speech_recognition as sr
+from collections import deque
+from functools import partial
 import webbrowser
 from main import (
     process_query, generate_code, say,
-    extract_city, get_weather, play_music, main
+    extract_city, get_weather, play_music, main, close_clients, warm_up
 )
+from engine import KaiEngine
+from streaming import SentenceChunker
+from voice import VoiceCapture
+from tts import tts
+from tracing import tracer
+from transcript import TranscriptLog, TRANSCRIPT_LOG
 from datetime import datetime
 
-# Initialize Text-to-Speech Engine
-engine = pyttsx3.init()
-engine.setProperty("rate", 175)
-engine.setProperty("volume", 1.0)
+# "google" (online) or "vosk" (offline, needs the model in recognizers.VOSK_MODEL_PATH)
+SPEECH_BACKEND = "google"
+
+# Keep the mic open while Kai talks and stop speaking as soon as the user starts.
+# Off by default: there is no echo cancellation, so Kai's own voice can trigger it.
+BARGE_IN = False
+
+# Trace every query and show the last DEBUG_TRACE_COUNT traces under the chat
+DEBUG_TRACES = False
+DEBUG_TRACE_COUNT = 5
+
+# Messages kept in the chat area; older ones are paged out to TRANSCRIPT_LOG and
+# brought back TRANSCRIPT_PAGE at a time when the user scrolls to the top
+TRANSCRIPT_LIMIT = 200
+TRANSCRIPT_PAGE = 50
+
+# Callbacks from worker threads run on the Tk thread at most UI_BATCH per tick
+UI_BATCH = 200
+UI_TICK_MS = 50
+
+BOLD = re.compile(r"\*\*(.*?)\*\*")
 
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
@@ -24,14 +48,12 @@ class KaiGUI(ctk.CTk):
     def __init__(self):
         super().__init__()
         self.title("🤖 Kai A.I. Voice Assistant")
-        self.geometry("800x580")
+        self.geometry("800x780" if DEBUG_TRACES else "800x580")
         self.resizable(False, False)
 
         self.dark_mode = ctk.get_appearance_mode() == "dark"
         self.mic_on = False
         self.full_response_text = ""
-        self.speech_thread = None
-        self.speech_stop_event = threading.Event()
 
         # Background Frame
         self.bg_frame = ctk.CTkFrame(self, fg_color=("gray10", "gray90"), corner_radius=0)
@@ -75,85 +97,243 @@ class KaiGUI(ctk.CTk):
                                      hover_color="#9c52b3", width=150, corner_radius=12)
         self.mic_btn.pack(side="left", padx=5)
 
+        # Optional per-stage timings of recent queries
+        self.trace_area = None
+        self.trace_version = -1
+        if DEBUG_TRACES:
+            tracer.enabled = True
+            self.trace_area = ctk.CTkTextbox(self.bg_frame, width=760, height=180, wrap=tk.NONE,
+                                             font=("Courier", 11), corner_radius=10)
+            self.trace_area.pack(pady=5)
+            self.after(500, self.refresh_traces)
+
         self.protocol("WM_DELETE_WINDOW", self.on_exit)
-        self.mic_thread = None
-        self.mic_lock = threading.Lock()
+
+        # Persistent capture pipeline; with barge-in the user's voice interrupts Kai,
+        # otherwise capture is muted while Kai is speaking so it doesn't hear itself
+        self.voice = VoiceCapture(
+            on_transcript=self.listen_mic,
+            on_partial=lambda text: self.ui_queue.put(partial(self.show_partial, text)),
+            backend=SPEECH_BACKEND,
+            on_status=lambda message: self.ui_queue.put(partial(self.display_message, f"\n{message}")),
+            should_listen=None if BARGE_IN else lambda: not self.is_speaking(),
+            is_output_active=self.is_speaking,
+            on_speech_start=self.barge_in if BARGE_IN else None,
+        )
+
+        # Background asyncio engine; its callbacks reach the Tk thread through ui_queue
+        self.engine = KaiEngine()
+        self.engine.on_shutdown.append(close_clients)
+        self.engine.start()
+        self.pending_queries = set()
+        self.speech_epoch = 0  # Bumped by barge-in; replies from an older epoch stay silent
+        self.ui_queue = queue.Queue()
+        self.after(UI_TICK_MS, self.drain_ui_queue)
+
+        # Each visible message starts at a text mark; the oldest are paged out to disk
+        self.history = TranscriptLog(TRANSCRIPT_LOG)
+        self.message_marks = deque()
+        self.mark_ids = itertools.count()
+        self.scroll_pending = False
 
         self.apply_theme()
 
-    def takeCommand(self):
-        """Captures voice input reliably & updates both GUI & terminal."""
-        r = sr.Recognizer()
-        with sr.Microphone() as source:
-            print("🎤 Listening...")
-            self.display_message("\n🎤 Listening...")
+        # Heavy SDKs load in the background once the first frame is on screen
+        self.after(100, self.warm_up)
 
-            r.adjust_for_ambient_noise(source, duration=1)
-            r.pause_threshold = 0.7
-            r.phrase_time_limit = 8
-            audio = r.listen(source)
+    def warm_up(self):
+        self.engine.submit(warm_up)
+        threading.Thread(target=self.voice.warm_up, name="kai-warm-up", daemon=True).start()
 
-        try:
-            return r.recognize_google(audio, language="en-in").lower()
-        except sr.UnknownValueError:
-            self.display_message("\n❌ Could not understand audio.")
-            print("❌ Could not understand audio.")
-            return None
-        except sr.RequestError:
-            self.display_message("\n⚠️ Speech recognition service unavailable.")
-            print("⚠️ Speech recognition service unavailable.")
-            return None
-
-    def speak_response(self, response):
+    def speak_response(self, response, trace=None):
         """Handles text-to-speech execution with interruption control."""
-        if self.speech_thread is not None and self.speech_thread.is_alive():
-            self.stop_speaking()  # Stop previous speech
+        tts.speak(response, interrupt=True, trace=trace)  # Stop previous speech
 
-        self.speech_thread = threading.Thread(target=self._run_speech, args=(response,), daemon=True)
-        self.speech_thread.start()
+    def speak_sentence(self, text, trace=None):
+        """Queues text behind whatever is already being spoken."""
+        tts.speak(text, trace=trace)
 
-    def _run_speech(self, text):
-        """Speaks the full response without pauses."""
-        self.speech_stop_event.clear()
+    def is_speaking(self):
+        return tts.is_speaking()
 
-        try:
-            engine.say(text)
-            engine.runAndWait()
-        except RuntimeError:
-            pass
-
-        self.speech_thread = None  # Reset thread for future speech
+    def cancel_speech(self):
+        """Drops queued sentences and interrupts the one being spoken."""
+        tts.stop()
 
     def stop_speaking(self):
-        """Interrupts ongoing speech but ensures next query works fine."""
-        if self.speech_thread and self.speech_thread.is_alive():
-            self.speech_stop_event.set()
-            engine.stop()
-            self.speech_thread = None  # Reset speech thread for the next query
+        """Interrupts ongoing speech and cancels replies that are still streaming."""
+        for future in list(self.pending_queries):
+            future.cancel()
+        self.cancel_speech()
+
+    def barge_in(self):
+        """The user started talking over Kai (capture thread); only the playback stops.
+
+        Replies and code generation keep running, so a cough doesn't throw away their work;
+        the replies already under way finish in the chat area without being spoken.
+        """
+        if self.is_speaking():
+            self.speech_epoch += 1
+            self.cancel_speech()
 
     def on_exit(self):
         self.mic_on = False
+        self.voice.close()
+        for future in list(self.pending_queries):
+            future.cancel()
+        self.engine.stop()
+        tts.shutdown()
         self.quit()
         self.destroy()
 
+    def submit_query(self, query):
+        """Runs main(query) on the engine loop; safe to call from any thread."""
+        # Voice queries arrive with the trace of their capture and recognition
+        trace = tracer.current() or tracer.new_trace(query)
+        reply = {"chunker": SentenceChunker(), "streamed": False, "trace": trace, "epoch": self.speech_epoch,
+                 "progress": False}
+        on_token = lambda token: self.ui_queue.put(partial(self.show_token, reply, token))
+
+        def on_progress(message):
+            # Tasks that report progress (code generation) announce each step themselves
+            reply["progress"] = True
+            self.ui_queue.put(partial(self.display_message, f"⚙️ {message}"))
+
+        future = self.engine.submit(main, query, on_token, on_progress, trace)
+        self.pending_queries.add(future)
+        future.add_done_callback(lambda f: self.ui_queue.put(partial(self.handle_result, f, reply)))
+        return future
+
+    def drain_ui_queue(self):
+        """Runs callbacks posted by worker threads on the Tk thread, a batch per tick.
+
+        Scrolling and transcript trimming happen once per batch rather than per insert.
+        """
+        try:
+            for _ in range(UI_BATCH):
+                try:
+                    callback = self.ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    callback()
+                except Exception as e:
+                    # One bad update must not stop the pump (and with it the window)
+                    print(f"UI update failed: {type(e).__name__}: {e}")
+
+            if self.scroll_pending:
+                self.scroll_pending = False
+                self.chat_area.see("end")
+                self.trim_transcript()
+            elif self.history and self.chat_area.yview()[0] <= 0.0:
+                self.load_older()
+        except Exception as e:
+            print(f"UI refresh failed: {type(e).__name__}: {e}")
+        finally:
+            # Come straight back when a backlog is left over
+            self.after(1 if not self.ui_queue.empty() else UI_TICK_MS, self.drain_ui_queue)
+
+    def show_token(self, reply, token):
+        """Appends a streamed token and speaks each sentence as soon as it is complete."""
+        if not reply["streamed"]:
+            reply["streamed"] = True
+            self.cancel_speech()
+            self.display_message("🤖 Kai: ", newline=False)
+
+        self.append_text(token.replace("**", ""))
+        for sentence in reply["chunker"].feed(token):
+            if reply["epoch"] == self.speech_epoch:
+                self.speak_sentence(sentence, reply["trace"])
+
+    def handle_result(self, future, reply):
+        self.pending_queries.discard(future)
+        if future.cancelled():
+            if reply["streamed"]:
+                self.append_text(" ⏹\n\n")
+            return
+        try:
+            response = future.result()
+        except Exception as e:
+            print(f"Query failed: {e}")
+            response = "I'm facing an issue, please try again later."
+
+        self.full_response_text = response
+        # Not if the user talked over it, nor over per-step announcements still being spoken
+        speak = reply["epoch"] == self.speech_epoch and not reply["progress"]
+        if reply["streamed"]:
+            if speak:
+                self.speak_sentence(reply["chunker"].flush(), reply["trace"])
+            self.append_text("\n\n")
+        else:
+            if speak:
+                self.speak_response(response, reply["trace"])
+            self.display_message(f"🤖 Kai: {response}\n")
+
     def process_input(self):
         query = self.input_entry.get()
         self.input_entry.delete(0, tk.END)
 
         if query:
             self.display_message(f"\n👤 You: {query}\n")
-            response = asyncio.run(main(query))
-            self.full_response_text = response
-            self.speak_response(response)
-            self.display_message(f"🤖 Kai: {response}\n")
-
-    def display_message(self, message):
-        cleaned_message = re.sub(r"\*\*(.*?)\*\*", r"\1", message)
-        self.chat_area.insert("end", cleaned_message + "\n")
-        self.chat_area.see("end")
+            self.submit_query(query)
+
+    def display_message(self, message, newline=True):
+        """Starts a new message in the chat area (Tk thread only; workers go through ui_queue)."""
+        mark = f"message{next(self.mark_ids)}"
+        self.chat_area.mark_set(mark, "end-1c")
+        self.chat_area.mark_gravity(mark, "left")
+        self.chat_area.insert("end", BOLD.sub(r"\1", message) + ("\n" if newline else ""))
+        self.message_marks.append(mark)
+        self.scroll_pending = True
+
+    def append_text(self, text):
+        """Continues the latest message (streamed tokens)."""
+        self.chat_area.insert("end", text)
+        self.scroll_pending = True
+
+    def trim_transcript(self):
+        """Pages the oldest messages out to the disk log once the chat holds more than TRANSCRIPT_LIMIT."""
+        excess = len(self.message_marks) - TRANSCRIPT_LIMIT
+        if excess <= 0:
+            return
+        marks = [self.message_marks.popleft() for _ in range(excess)]
+        end = self.message_marks[0]
+        starts = marks + [end]
+        self.history.push([self.chat_area.get(a, b) for a, b in zip(starts, starts[1:])])
+        self.chat_area.delete("1.0", end)
+        for mark in marks:
+            self.chat_area.mark_unset(mark)
+
+    def load_older(self):
+        """Brings the previous page of messages back from the disk log (user scrolled to the top)."""
+        first = self.message_marks[0]
+        self.chat_area.mark_gravity(first, "right")  # Stays ahead of the older text going in before it
+        older = []
+        for message in self.history.pop(TRANSCRIPT_PAGE):
+            mark = f"message{next(self.mark_ids)}"
+            self.chat_area.mark_set(mark, first)
+            self.chat_area.mark_gravity(mark, "left")
+            self.chat_area.insert(first, message)
+            older.append(mark)
+        self.chat_area.mark_gravity(first, "left")
+        self.message_marks.extendleft(reversed(older))
+        self.chat_area.see(first)
+
+    def refresh_traces(self):
+        """Redraws the debug pane when traces changed (spoken sentences land after the reply)."""
+        if tracer.version != self.trace_version:
+            self.trace_version = tracer.version
+            traces = list(tracer.traces)[::-1][:DEBUG_TRACE_COUNT]
+            self.trace_area.delete("1.0", "end")
+            self.trace_area.insert("end", "\n\n".join(trace.format() for trace in traces))
+        self.after(500, self.refresh_traces)
 
     def clear_chat(self):
         self.chat_area.delete("1.0", "end")
+        for mark in self.message_marks:
+            self.chat_area.mark_unset(mark)
+        self.message_marks.clear()
+        self.history.clear()
 
     def toggle_theme(self):
         self.dark_mode = not self.dark_mode
@@ -168,32 +348,28 @@ class KaiGUI(ctk.CTk):
         self.title_label.configure(text_color="white" if self.dark_mode else "black")
 
     def toggle_mic(self):
-        if self.speech_thread is not None and self.speech_thread.is_alive():
+        if self.is_speaking() and not BARGE_IN:
             return
 
         self.mic_on = not self.mic_on
         self.mic_btn.configure(text="🎤 Mic ON" if self.mic_on else "🎤 Mic OFF")
 
         if self.mic_on:
-            if self.mic_thread is None or not self.mic_thread.is_alive():
-                self.mic_thread = threading.Thread(target=self.listen_mic, daemon=True)
-                self.mic_thread.start()
-
-    def listen_mic(self):
-        """Listens and processes user speech."""
-        self.last_query = ""
-
-        while self.mic_on:
-            self.last_query = self.takeCommand()
-
-        if self.last_query:
-            print("🔍 Recognizing...")
-            self.display_message("\n🔍 Recognizing...")
-            self.display_message(f"\n👤 You (via Mic): {self.last_query}\n")
-            response = asyncio.run(main(self.last_query))
-            self.full_response_text = response
-            self.speak_response(response)
-            self.display_message(f"🤖 Kai: {response}\n")
+            self.voice.start()
+        else:
+            self.voice.stop()
+
+    def show_partial(self, text):
+        """Shows the live hypothesis in the input field while the user is speaking."""
+        self.input_entry.delete(0, tk.END)
+        self.input_entry.insert(0, text)
+
+    def listen_mic(self, query):
+        """Processes each recognized utterance as soon as it is transcribed (recognition thread)."""
+        print(f"👤 You (via Mic): {query}")
+        self.ui_queue.put(partial(self.input_entry.delete, 0, tk.END))
+        self.ui_queue.put(partial(self.display_message, f"\n👤 You (via Mic): {query}\n"))
+        self.submit_query(query)
 
 if __name__ == "__main__":
     app = KaiGUI()
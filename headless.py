@@ -0,0 +1,293 @@
+"""Headless Kai: run queries through main() without the GUI, speech or desktop actions.
+
+Batch mode reads JSONL ({"id": ..., "query": "..."} or a bare JSON string per line) from a
+file or stdin, runs the queries concurrently and writes one JSON result per line in
+completion order (an {"id": ..., "error": ...} record for lines that aren't valid queries,
+which also make the exit status 1). Server mode exposes the same dispatch over local HTTP
+and WebSocket:
+
+    POST /query  {"query": "..."}  ->  {"reply": ..., "intent": ..., "latency_ms": ...}
+    GET  /stats                    ->  latency percentiles and throughput so far
+    GET  /metrics, /traces         ->  with --trace: stage histograms (Prometheus text), recent traces
+    GET  /ws                       ->  WebSocket; send {"query": ...}, receive {"token": ...}
+                                       messages while the reply streams, then the result
+
+Run: python headless.py batch [queries.jsonl] [--concurrency N] [--trace]
+     python headless.py serve [--host 127.0.0.1] [--port 8765] [--concurrency N] [--trace]
+"""
+import argparse
+import asyncio
+import base64
+import contextlib
+import hashlib
+import json
+import struct
+import sys
+import time
+import main as kai
+from intents import kai_router
+from providers import ProviderStats
+from tracing import tracer
+from tts import tts
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC11B85"
+
+
+def go_headless():
+    """Silence TTS and skip launching apps/browsers; replies are only returned."""
+    tts.enabled = False
+    kai.DESKTOP_ACTIONS = False
+
+
+class QueryRunner:
+    """Runs queries through main() under a concurrency limit and tracks latency and throughput.
+
+    Queries are independent: they come from unrelated lines or clients, so none of them
+    reads or adds to the shared conversation memory.
+    """
+
+    def __init__(self, concurrency=8):
+        self.limit = asyncio.Semaphore(concurrency)
+        self.stats = ProviderStats(window=10000)
+        self.started = time.perf_counter()
+
+    async def run(self, query, query_id=None, on_token=None):
+        result = {"id": query_id, "query": query}
+        async with self.limit:
+            start = time.perf_counter()
+            error = None
+            try:
+                result["intent"] = kai_router.classify(query).intent
+                result["reply"] = await kai.main(query, on_token=on_token, remember=False)
+            except Exception as e:
+                error = e
+                result["error"] = f"{type(e).__name__}: {e}"
+            latency = time.perf_counter() - start
+        self.stats.record(latency, error)
+        result["latency_ms"] = round(latency * 1000, 1)
+        return result
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        snapshot = self.stats.snapshot()
+        for pct in ("p50", "p95"):
+            if snapshot[pct] is not None:
+                snapshot[pct] = round(snapshot[pct] * 1000, 1)
+        snapshot["elapsed_s"] = round(elapsed, 3)
+        snapshot["throughput_qps"] = round(self.stats.requests / elapsed, 2) if elapsed else 0.0
+        return snapshot
+
+
+def parse_query(item):
+    """The query of a decoded request: a JSON string or {"query": "..."}; ValueError otherwise."""
+    query = item.get("query") if isinstance(item, dict) else item
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError('expected a JSON string or {"query": "..."}')
+    return query
+
+
+def read_queries(lines):
+    """Yields (id, query, error) from JSONL lines; ids default to the line number.
+
+    A line that isn't a valid query comes back with query None and the reason in error.
+    """
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        query_id, query, error = number, None, None
+        try:
+            item = json.loads(line)
+            if isinstance(item, dict):
+                query_id = item.get("id", number)
+            query = parse_query(item)
+        except ValueError as e:
+            error = f"Invalid line {number}: {e}"
+        yield query_id, query, error
+
+
+async def run_batch(lines, output, concurrency=8):
+    """Runs the queries and writes results as they finish; invalid lines get an error record."""
+    runner = QueryRunner(concurrency)
+    jobs = []
+    invalid = 0
+
+    def write(result):
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        output.flush()
+
+    try:
+        for query_id, query, error in read_queries(lines):
+            if error:
+                invalid += 1
+                write({"id": query_id, "error": error})
+            else:
+                jobs.append(asyncio.ensure_future(runner.run(query, query_id)))
+        for job in asyncio.as_completed(jobs):
+            write(await job)
+    finally:
+        for job in jobs:
+            job.cancel()
+        await kai.close_clients()
+    return dict(runner.summary(), invalid_lines=invalid)
+
+
+class KaiServer:
+    """Minimal local HTTP + WebSocket front end (stdlib asyncio streams, no web framework)."""
+
+    def __init__(self, host="127.0.0.1", port=8765, concurrency=8):
+        self.host = host
+        self.port = port
+        self.runner = QueryRunner(concurrency)
+
+    async def serve(self):
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"Kai listening on http://{self.host}:{self.port}", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await kai.close_clients()
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) < 2:
+                return
+            method, path = request_line[0], request_line[1]
+
+            if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self._websocket(reader, writer, headers)
+            elif method == "POST" and path == "/query":
+                try:
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError("negative Content-Length")
+                    query = parse_query(json.loads(await reader.readexactly(length)))
+                except ValueError:
+                    await self._respond(writer, 400, {"error": 'Expected a JSON body like {"query": "..."}'})
+                    return
+                await self._respond(writer, 200, await self.runner.run(query))
+            elif method == "GET" and path == "/stats":
+                await self._respond(writer, 200, self.runner.summary())
+            elif method == "GET" and path == "/metrics":
+                await self._respond(writer, 200, tracer.registry.to_prometheus(), "text/plain; version=0.0.4")
+            elif method == "GET" and path == "/traces":
+                await self._respond(writer, 200, tracer.recent())
+            else:
+                await self._respond(writer, 404, {"error": "Not found"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, content_type="application/json"):
+        text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+        body = text.encode("utf-8")
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found"}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def _websocket(self, reader, writer, headers):
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WS_GUID).encode()).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1")
+        )
+        await writer.drain()
+
+        def send(payload):
+            writer.write(ws_frame(json.dumps(payload, ensure_ascii=False).encode("utf-8")))
+
+        while True:
+            opcode, data = await ws_read(reader)
+            if opcode == 0x8:  # Close
+                writer.write(ws_frame(b"", opcode=0x8))
+                await writer.drain()
+                return
+            if opcode == 0x9:  # Ping
+                writer.write(ws_frame(data, opcode=0xA))
+            elif opcode == 0x1:
+                try:
+                    message = json.loads(data)
+                    query = parse_query(message)
+                except ValueError:
+                    send({"error": 'Expected {"query": "..."}'})
+                else:
+                    query_id = message.get("id") if isinstance(message, dict) else None
+                    send(await self.runner.run(query, query_id, on_token=lambda token: send({"token": token})))
+            await writer.drain()
+
+
+def ws_frame(payload, opcode=0x1):
+    """One unmasked, unfragmented server-to-client WebSocket frame."""
+    header = bytes([0x80 | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 1 << 16:
+        header += bytes([126]) + struct.pack("!H", len(payload))
+    else:
+        header += bytes([127]) + struct.pack("!Q", len(payload))
+    return header + payload
+
+
+async def ws_read(reader):
+    """Read one (masked) client frame; returns (opcode, payload). Fragments are joined."""
+    data, opcode = b"", 0
+    while True:
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+        chunk = await reader.readexactly(length)
+        data += bytes(b ^ mask[i % 4] for i, b in enumerate(chunk))
+        opcode = first & 0x0F or opcode
+        if first & 0x80:
+            return opcode, data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    modes = parser.add_subparsers(dest="mode", required=True)
+    batch = modes.add_parser("batch", help="Run JSONL queries and print JSONL results")
+    batch.add_argument("input", nargs="?", default="-", help="JSONL file, or - for stdin")
+    serve = modes.add_parser("serve", help="Serve HTTP and WebSocket on localhost")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    for mode in (batch, serve):
+        mode.add_argument("--concurrency", type=int, default=8)
+        mode.add_argument("--trace", action="store_true", help="Record per-stage timings")
+    args = parser.parse_args()
+
+    go_headless()
+    tracer.enabled = args.trace
+    if args.mode == "batch":
+        results = sys.stdout
+        # Kai's progress prints go to stderr so stdout stays valid JSONL
+        with contextlib.redirect_stdout(sys.stderr):
+            source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+            with source:
+                summary = asyncio.run(run_batch(source.readlines(), results, args.concurrency))
+        print(json.dumps({"summary": summary}), file=sys.stderr)
+        if args.trace:
+            print(tracer.registry.to_prometheus(), file=sys.stderr)
+        sys.exit(1 if summary["invalid_lines"] else 0)
+    else:
+        try:
+            asyncio.run(KaiServer(args.host, args.port, args.concurrency).serve())
+        except KeyboardInterrupt:
+            pass
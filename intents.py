@@ -0,0 +1,129 @@
+import datetime
+import re
+from tracing import tracer
+
+# Slot patterns, compiled once; all expect lower-cased text
+LANGUAGE_PATTERN = re.compile(r"\b(c\+\+|cpp|javascript|java|python|html|c)(?![\w+])")
+# Time words that can trail a city ("weather in delhi this week"); not part of the name
+WHEN_SUFFIX = (
+    r"(?:today|tonight|tomorrow|yesterday|now|right now|currently|later|please|at the moment|"
+    r"(?:this|next) (?:week|weekend|morning|afternoon|evening|month)|"
+    r"(?:tomorrow|today) (?:morning|afternoon|evening|night))"
+)
+CITY_PATTERN = re.compile(
+    r"\b(?:weather|temperature)\b.*?\b(?:in|at|for)\s+([a-z][a-z\s]*?)"
+    rf"(?:\s+{WHEN_SUFFIX})*\s*[?.!]*$"
+)
+SITE_PATTERN = re.compile(r"\bopen\s+(?:the\s+)?(.+?)(?:\s+(?:website|site|please))?\s*[?.!]*$")
+
+CURRENT_YEAR = datetime.date.today().year
+
+
+class Intent:
+    """A routing rule: every group in requires must contain at least one keyword found in the query.
+
+    anchor is an optional extra regex that must also match; slots maps slot names to
+    patterns whose first group is extracted once the intent has won.
+    """
+
+    def __init__(self, name, priority, requires, anchor=None, slots=None):
+        self.name = name
+        self.priority = priority
+        self.requires = [set(group) for group in requires]
+        self.anchor = re.compile(anchor) if anchor else None
+        self.slots = slots or {}
+
+    def matches(self, found, text):
+        return all(group & found for group in self.requires) and (
+            self.anchor is None or self.anchor.search(text) is not None
+        )
+
+    def extract(self, text):
+        values = {}
+        for slot, pattern in self.slots.items():
+            match = pattern.search(text)
+            if match:
+                values[slot] = match.group(1).strip()
+        return values
+
+
+class RouteMatch:
+    def __init__(self, intent, slots):
+        self.intent = intent
+        self.slots = slots
+
+    def __repr__(self):
+        return f"RouteMatch({self.intent!r}, {self.slots!r})"
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+class IntentRouter:
+    """Routes a query with a single keyword-regex pass plus priority-ordered rules.
+
+    Handlers are registered per intent with the handler() decorator and receive
+    (query, slots, **context).
+    """
+
+    def __init__(self, intents, default="chat"):
+        self.intents = sorted(intents, key=lambda intent: -intent.priority)
+        self.default = default
+        self.handlers = {}
+        keywords = {keyword for intent in intents for group in intent.requires for keyword in group}
+        # Longest first so multi-word phrases win over their prefixes
+        alternatives = "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+        self.keyword_pattern = re.compile(rf"\b(?:{alternatives})(?![\w+])")
+
+    def classify(self, query):
+        text = normalize_query(query)
+        found = set(self.keyword_pattern.findall(text))
+        if found:
+            for intent in self.intents:
+                if intent.matches(found, text):
+                    return RouteMatch(intent.name, intent.extract(text))
+        return RouteMatch(self.default, {})
+
+    def handler(self, name):
+        """Decorator registering an async handler for an intent."""
+        def register(fn):
+            self.handlers[name] = fn
+            return fn
+        return register
+
+    async def dispatch(self, query, **context):
+        with tracer.span("route"):
+            match = self.classify(query)
+        trace = tracer.current()
+        if trace is not None:
+            trace.attrs["intent"] = match.intent
+        handler = self.handlers.get(match.intent) or self.handlers[self.default]
+        with tracer.span("handler." + match.intent):
+            return await handler(query, match.slots, **context)
+
+
+REALTIME_KEYWORDS = [
+    "latest", "recent", "news", "who won", "current", "today", "yesterday", "tomorrow", "next", "new",
+] + [str(year) for year in range(CURRENT_YEAR - 2, CURRENT_YEAR + 2)]
+
+KAI_INTENTS = [
+    Intent("exit", 100, [["exit", "quit", "stop", "shutdown"]], anchor=r"^(?:kai )?(?:exit|quit|stop|shutdown)$"),
+    # Without a language it's prose ("write a movie script", "a code of conduct"): left to chat
+    Intent("code", 90, [["write", "create", "generate"], ["program", "programs", "code", "script"]],
+           anchor=LANGUAGE_PATTERN.pattern, slots={"language": LANGUAGE_PATTERN}),
+    Intent("music", 80, [["play", "open", "start"], ["music", "song", "songs", "spotify"]]),
+    Intent("open", 70, [["open"]],
+           anchor=r"^(?:(?:hey )?kai\W* )?(?:please |can you |could you )*open \S",
+           slots={"site": SITE_PATTERN}),
+    Intent("weather", 60, [["weather", "temperature"]], slots={"city": CITY_PATTERN}),
+    Intent("date", 50, [["date", "day"]],
+           anchor=r"(?:\bwhat(?:'s| is)? (?:the |today's )?date|\btoday's date|\bcurrent date|"
+                  r"\bwhat day is (?:it|today)|^(?:the )?date)(?: (?:today|now|please))?\W*$"),
+    Intent("time", 40, [["time"]],
+           anchor=r"(?:\bwhat(?:'s| is)? the (?:current )?time|\bwhat time is it|\bcurrent time|"
+                  r"\btell me the time|^(?:the )?time)(?: (?:now|right now|please))?\W*$"),
+    Intent("search", 30, [REALTIME_KEYWORDS]),
+]
+
+kai_router = IntentRouter(KAI_INTENTS)
@@ -0,0 +1,231 @@
+"""Launching desktop apps and controlling media playback without blocking the event loop.
+
+launch() starts a command and polls a readiness check instead of sleeping for a fixed time.
+Media control goes through MPRIS over D-Bus on Linux and the system media keys on Windows.
+"""
+import asyncio
+import shutil
+import sys
+import time
+
+MPRIS_PREFIX = "org.mpris.MediaPlayer2."
+MPRIS_PATH = "/org/mpris/MediaPlayer2"
+
+VK_MEDIA_NEXT_TRACK, VK_MEDIA_PREV_TRACK, VK_MEDIA_PLAY_PAUSE = 0xB0, 0xB1, 0xB3
+KEYEVENTF_KEYUP = 0x0002
+
+# Spoken site name -> URL; looked up with spaces removed, so "stack overflow" and "stackoverflow" both work
+SITE_ALIASES = {
+    "youtube": "https://www.youtube.com",
+    "google": "https://www.google.com",
+    "gmail": "https://mail.google.com",
+    "google maps": "https://maps.google.com",
+    "maps": "https://maps.google.com",
+    "google drive": "https://drive.google.com",
+    "drive": "https://drive.google.com",
+    "google news": "https://news.google.com",
+    "github": "https://github.com",
+    "stack overflow": "https://stackoverflow.com",
+    "wikipedia": "https://www.wikipedia.org",
+    "chatgpt": "https://chatgpt.com",
+    "gemini": "https://gemini.google.com",
+    "whatsapp": "https://web.whatsapp.com",
+    "linkedin": "https://www.linkedin.com",
+    "twitter": "https://x.com",
+    "x": "https://x.com",
+    "instagram": "https://www.instagram.com",
+    "facebook": "https://www.facebook.com",
+    "reddit": "https://www.reddit.com",
+    "amazon": "https://www.amazon.in",
+    "flipkart": "https://www.flipkart.com",
+    "netflix": "https://www.netflix.com",
+    "spotify": "https://open.spotify.com",
+    "leetcode": "https://leetcode.com",
+    "hacker rank": "https://www.hackerrank.com",
+    "geeks for geeks": "https://www.geeksforgeeks.org",
+    "w3schools": "https://www.w3schools.com",
+}
+SITE_URLS = {name.replace(" ", ""): url for name, url in SITE_ALIASES.items()}
+
+
+def resolve_site(name):
+    """URL for a spoken site name: alias table, then anything domain-like, then www.<name>.com."""
+    key = "".join(name.lower().split()).strip(".")
+    if key in SITE_URLS:
+        return SITE_URLS[key]
+    if key.startswith(("http://", "https://")):
+        return key
+    if "." in key:
+        return f"https://{key}"
+    return f"https://www.{key}.com"
+
+
+async def run_command(*args):
+    """Run a command without a shell; returns (exit code, stdout) or (None, "") if it isn't installed."""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *args, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except FileNotFoundError:
+        return None, ""
+    stdout, _ = await process.communicate()
+    return process.returncode, stdout.decode(errors="replace")
+
+
+async def launch(command, ready, timeout=15.0, interval=0.25):
+    """Start a shell command (if ready() isn't already true) and wait until ready() is true.
+
+    ready is an async callable, or None to return right after starting the command.
+    Returns True once the app is ready; False on timeout (the app is left running) or as
+    soon as the command exits with an error.
+    """
+    if ready is not None and await ready():
+        return True
+    process = await asyncio.create_subprocess_shell(
+        command, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    asyncio.ensure_future(process.wait())  # Reaps launchers that exit right away ("start spotify")
+    if ready is None:
+        return True
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(interval)
+        if await ready():
+            return True
+        if process.returncode:  # Set by the wait() above; launchers that exit 0 keep polling
+            print(f"{command!r} exited with status {process.returncode}")
+            return False
+    return False
+
+
+class MediaController:
+    """Playback control for one player app; backends override the methods they support."""
+
+    name = "none"
+
+    def __init__(self, app="spotify"):
+        self.app = app
+
+    async def is_ready(self):
+        """True once the player is running and can take commands."""
+        return False
+
+    async def play(self):
+        return False
+
+    async def play_pause(self):
+        return False
+
+    async def next(self):
+        return False
+
+    async def previous(self):
+        return False
+
+
+class MprisController(MediaController):
+    """Linux: the player's MPRIS interface on the session bus, through dbus-send."""
+
+    name = "mpris"
+
+    @property
+    def bus_name(self):
+        return MPRIS_PREFIX + self.app
+
+    async def is_ready(self):
+        code, output = await run_command(
+            "dbus-send", "--session", "--print-reply", "--dest=org.freedesktop.DBus", "/org/freedesktop/DBus",
+            "org.freedesktop.DBus.NameHasOwner", f"string:{self.bus_name}",
+        )
+        return code == 0 and "boolean true" in output
+
+    async def _call(self, method):
+        code, _ = await run_command(
+            "dbus-send", "--session", "--type=method_call", f"--dest={self.bus_name}", MPRIS_PATH,
+            f"org.mpris.MediaPlayer2.Player.{method}",
+        )
+        return code == 0
+
+    async def play(self):
+        return await self._call("Play")
+
+    async def play_pause(self):
+        return await self._call("PlayPause")
+
+    async def next(self):
+        return await self._call("Next")
+
+    async def previous(self):
+        return await self._call("Previous")
+
+
+class WindowsMediaController(MediaController):
+    """Windows: waits for a visible window of the app's process, then presses the media keys.
+
+    Media keys reach the active media session without focusing the app (unlike typing a
+    space into it) and need no PowerShell process.
+    """
+
+    name = "windows"
+
+    async def is_ready(self):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._has_window)
+
+    def _has_window(self):
+        import ctypes
+        from ctypes import wintypes
+
+        user32, kernel32 = ctypes.windll.user32, ctypes.windll.kernel32
+        image = f"{self.app}.exe".lower()
+        found = []
+
+        def visit(hwnd, _):
+            if not user32.IsWindowVisible(hwnd) or not user32.GetWindowTextLengthW(hwnd):
+                return True
+            pid = wintypes.DWORD()
+            user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+            handle = kernel32.OpenProcess(0x1000, False, pid.value)  # PROCESS_QUERY_LIMITED_INFORMATION
+            if handle:
+                size = wintypes.DWORD(260)
+                path = ctypes.create_unicode_buffer(size.value)
+                if kernel32.QueryFullProcessImageNameW(handle, 0, path, ctypes.byref(size)):
+                    if path.value.lower().endswith("\\" + image):
+                        found.append(hwnd)
+                kernel32.CloseHandle(handle)
+            return not found
+
+        callback = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)(visit)
+        user32.EnumWindows(callback, 0)
+        return bool(found)
+
+    @staticmethod
+    def _press(key):
+        import ctypes
+
+        ctypes.windll.user32.keybd_event(key, 0, 0, 0)
+        ctypes.windll.user32.keybd_event(key, 0, KEYEVENTF_KEYUP, 0)
+        return True
+
+    async def play(self):
+        return self._press(VK_MEDIA_PLAY_PAUSE)
+
+    async def play_pause(self):
+        return self._press(VK_MEDIA_PLAY_PAUSE)
+
+    async def next(self):
+        return self._press(VK_MEDIA_NEXT_TRACK)
+
+    async def previous(self):
+        return self._press(VK_MEDIA_PREV_TRACK)
+
+
+def media_controller(app="spotify"):
+    """The media backend for this platform (a no-op controller where none is available)."""
+    if sys.platform == "win32":
+        return WindowsMediaController(app)
+    if sys.platform.startswith("linux") and shutil.which("dbus-send"):
+        return MprisController(app)
+    return MediaController(app)
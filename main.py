@@ -1,75 +1,125 @@
-import speech_recognition as sr
 import os
 import webbrowser
-import google.generativeai as genai
 import datetime
-import pyttsx3
 import asyncio
-import random
 import re
-import time
-import subprocess
-import requests
-from mistralai.async_client import MistralAsyncClient
-from mistralai.models.chat_completion import ChatMessage
-from serpapi import GoogleSearch
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from config import GEMINI_API_KEY, MISTRAL_API_KEY, WEATHER_API_KEY, SERPAPI_KEY, SPOTIFY_CMD
-
-# Initialize AI Models
-genai.configure(api_key=GEMINI_API_KEY)
-mistral_client = MistralAsyncClient(api_key=MISTRAL_API_KEY)
-
-# Initialize text-to-speech
-engine = pyttsx3.init()
-engine.setProperty("rate", 175)
-engine.setProperty("volume", 1.0)
-
-chatStr = ""
-
-def say(text):
-    """Convert text to speech."""
-    engine.say(text)
-    engine.runAndWait()
-
-async def search_web(query):
+from providers import GeminiProvider, MistralProvider, ProviderRouter
+from streaming import stream_reply
+from cache import ResponseCache, CHAT_CACHE_TTL, SEARCH_CACHE_TTL
+from weather import WeatherClient, WeatherError
+from search import SearchClient, summarize_snippets
+from memory import ConversationMemory, is_follow_up
+from tts import tts, NORMAL, URGENT
+from intents import kai_router, LANGUAGE_PATTERN, CITY_PATTERN, SITE_PATTERN
+from tracing import tracer
+from validation import extract_code_blocks, check_program, save_program, FAILED, UNCHECKED
+from program_index import ProgramIndex, PROGRAM_INDEX_PATH, FUNCTION_PATTERN, CLASS_PATTERN
+from launcher import launch, media_controller, resolve_site
+
+# Initialize AI Models (the SDKs are imported lazily; see warm_up)
+gemini = GeminiProvider(GEMINI_API_KEY)
+mistral = MistralProvider(MISTRAL_API_KEY)
+
+# Gemini first, Mistral as backup; set hedge=True to race Mistral when Gemini is slow
+ai_router = ProviderRouter([gemini, mistral], hedge=False)
+
+# Reply cache in front of the providers; set a path (e.g. "kai_cache.db") to keep it across restarts
+RESPONSE_CACHE_PATH = None
+response_cache = ResponseCache(max_entries=512, ttl=CHAT_CACHE_TTL, path=RESPONSE_CACHE_PATH)
+
+weather_client = WeatherClient(WEATHER_API_KEY)
+search_client = SearchClient(SERPAPI_KEY, location="India", hl="en", gl="in")
+
+# "model" rephrases search snippets with the AI (streamed when the caller streams),
+# "skip" condenses them locally without a second network round-trip
+SEARCH_SUMMARY = "model"
+
+# How many programs generate_code asks the AI for at the same time
+CODE_GEN_CONCURRENCY = 3
+
+# Generated programs are compile-checked in worker processes and saved here; with
+# VALIDATION_SMOKE_TEST they are also run (sandboxed, VALIDATION_TIMEOUT seconds)
+OUTPUT_DIR = "Outputs"
+VALIDATE_CODE = True
+VALIDATION_SMOKE_TEST = False
+VALIDATION_TIMEOUT = 10.0
+VALIDATION_WORKERS = None  # One per CPU
+CODE_REPAIR_ATTEMPTS = 2
+_validation_pool = None
+
+# Programs already in OUTPUT_DIR are reused for the same task unless the request asks for a new one
+program_index = ProgramIndex(PROGRAM_INDEX_PATH, OUTPUT_DIR)
+FORCE_REGENERATE = re.compile(r"\b(?:new|fresh|again|from scratch|regenerate)\b")
+
+# Launch apps and browser tabs for "play music" / "open ..." (headless.py turns this off)
+DESKTOP_ACTIONS = True
+
+# Playback control for Spotify (MPRIS on Linux, media keys on Windows) and how long to wait for it to start
+media = media_controller("spotify")
+MUSIC_LAUNCH_TIMEOUT = 15.0
+
+async def summarize_history(transcript):
+    """Used by the conversation memory to compact old turns."""
+    return await ai_router.generate(
+        "Summarize this conversation in a few sentences, keeping names, facts and open questions:\n" + transcript
+    )
+
+# Multi-turn context sent to the providers; set a path (e.g. "kai_memory.json") to keep it across restarts
+MEMORY_PATH = None
+memory = ConversationMemory(token_budget=1500, summarizer=summarize_history)
+if MEMORY_PATH:
+    memory.load(MEMORY_PATH)
+
+def say(text, priority=NORMAL, cache=False):
+    """Convert text to speech (queued on the shared TTS service; never blocks)."""
+    tts.speak(text, priority, cache=cache)
+
+def announce_failover(failed, backup, reason):
+    """Spoken while the backup request is already running."""
+    if reason == "failed":
+        say("Primary AI failed. Switching to backup AI, Mistral.", URGENT)
+
+ai_router.on_failover = announce_failover
+
+async def search_web(query, summarize=None, on_token=None, remember=True):
     """Fetch real-time search results using SerpAPI and format response."""
-    params = {
-        "q": query,
-        "location": "India",
-        "hl": "en",
-        "gl": "in",
-        "api_key": SERPAPI_KEY
-    }
+    summarize = summarize or SEARCH_SUMMARY
     try:
-        search = GoogleSearch(params)
-        results = search.get_dict()
-
-        if "organic_results" in results and results["organic_results"]:
-            raw_snippets = [result["snippet"] for result in results["organic_results"][:5]]
-            full_text = "\n".join(set(raw_snippets))  # Remove duplicates
-
-            ai_prompt = f"Here are web search results:\n{full_text}\n\nPlease format this into a natural-sounding response."
-            return await chat_with_ai(ai_prompt)
-        else:
-            return "I couldn't find a clear answer for that."
+        with tracer.span("search.fetch"):
+            raw_snippets = await search_client.search(query)
     except Exception as e:
         print(f"Error fetching search results: {e}")
         return "I'm having trouble retrieving information right now."
 
+    if not raw_snippets:
+        return "I couldn't find a clear answer for that."
 
-async def process_query(query):
-    """Decide whether to fetch live data or use AI models."""
-    query_lower = query.lower()
+    with tracer.span("search.summarize", mode=summarize):
+        if summarize == "skip":
+            reply = summarize_snippets(query, raw_snippets)
+        else:
+            full_text = "\n".join(dict.fromkeys(raw_snippets))  # Remove duplicates
+            ai_prompt = f"Here are web search results:\n{full_text}\n\nPlease format this into a natural-sounding response."
+            reply = await chat_with_ai(ai_prompt, on_token, cache_ttl=SEARCH_CACHE_TTL, remember=False)
+
+    # Remember the question, not the snippet-laden prompt
+    if remember:
+        memory.add("user", query)
+        memory.add("assistant", reply)
+    return reply
 
-    # Explicit checks for date and time queries
 
-    # Real-time search trigger conditions
-    keywords = ["latest", "recent", "news", "who won", "current", "today", "2024", "2025", "next", "yesterday",
-                "tomorrow", "new"]
-    if any(word in query_lower for word in keywords):
-        return await search_web(query)
+async def process_query(query, on_token=None):
+    """Decide whether to fetch live data or use AI models."""
+    # Real-time search trigger conditions are the router's "search" intent
+    if kai_router.classify(query).intent == "search":
+        return await search_web(query, on_token=on_token)
 
-    return await chat_with_ai(query)
+    return await chat_with_ai(query, on_token)
 
 def detect_language(text):
     """Detect the programming language based on the user query."""
@@ -82,19 +132,12 @@ def detect_language(text):
         "javascript": ".js",
         "html": ".html"
     }
-    for lang in languages:
-        if lang in text.lower():
-            return lang, languages[lang]
+    # Word-boundary match so "java" doesn't hit "javascript" and "c" doesn't hit every word
+    match = LANGUAGE_PATTERN.search(text.lower())
+    if match:
+        return match.group(1), languages[match.group(1)]
     return None, None
 
-def extract_code_block(text):
-    """Extract code inside triple backticks (```...`) from AI response."""
-    matches = re.findall(r"```(?:\w+\n)?(.*?)```", text, re.DOTALL)
-    if matches:
-        return matches[0].strip()
-    else:
-        return None
-
 def is_code(text):
     """Check if the given text looks like code."""
     # If text starts with ``` or contains keywords like def, class, #include
@@ -110,8 +153,8 @@ def split_into_tasks(query):
 def generate_filename(code, extension, query="factorial"):
     """Generate a better filename based on the code content or user query."""
     # Try to find a function or class name in the code (this works for Python, Java, etc.)
-    function_match = re.search(r"\bdef\s+(\w+)\s?\(", code)  # For Python
-    class_match = re.search(r"\bclass\s+(\w+)\s?", code)  # For class names
+    function_match = FUNCTION_PATTERN.search(code)  # For Python
+    class_match = CLASS_PATTERN.search(code)  # For class names
 
     # First, try using the function or class name
     if function_match:
@@ -131,152 +174,309 @@ def generate_filename(code, extension, query="factorial"):
     # Return the final filename
     return f"{filename_base}{extension}"
 
-async def generate_code(query):
-    """Generates one or multiple code programs based on user query."""
+def validation_pool():
+    """Process pool for compiling/running generated programs, started on first use (and after it breaks).
+
+    Workers come from a fork server (spawn on Windows), not a fork of this process, which
+    by then runs the Tk, engine, TTS and audio threads.
+    """
+    global _validation_pool
+    if _validation_pool is None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _validation_pool = ProcessPoolExecutor(VALIDATION_WORKERS, mp_context=multiprocessing.get_context(method))
+    return _validation_pool
+
+async def check_block(code, lang):
+    """Runs check_program in the process pool; a block the pool couldn't check is UNCHECKED."""
+    global _validation_pool
+    pool = validation_pool()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            pool, check_program, lang, code, VALIDATION_SMOKE_TEST, VALIDATION_TIMEOUT
+        )
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool) and _validation_pool is pool:
+            _validation_pool = None  # A worker died; the next check starts a fresh pool
+            pool.shutdown(wait=False, cancel_futures=True)
+        print(f"Validation error: {type(e).__name__}: {e}")
+        return UNCHECKED, "compile", f"{type(e).__name__}: {e}"
+
+async def validate_reply(reply, lang):
+    """Checks every lang code block of reply in the process pool; returns [(code, (status, stage, message))]."""
+    blocks = [code for _, code in extract_code_blocks(reply, lang)]
+    if not VALIDATE_CODE:
+        return [(code, (UNCHECKED, "compile", "validation is off")) for code in blocks]
+    return list(zip(blocks, await asyncio.gather(*(check_block(code, lang) for code in blocks))))
+
+async def generate_program(idx, task, limit, lang, force=False):
+    """Generates and validates a single program; returns (idx, checked blocks, error).
+
+    When no code comes back or a block fails its check, the AI is asked again with the
+    error, up to CODE_REPAIR_ATTEMPTS times; the last attempt is returned either way.
+    force skips the reply cache.
+    """
+    async with limit:
+        full_reply = None if force else response_cache.get(task, namespace="code")
+        prompt, prompts = task, {"mistral": f"Write {task}"}
+        for attempt in range(CODE_REPAIR_ATTEMPTS + 1):
+            if full_reply is None:
+                # Gemini first, Mistral if it fails or its circuit is open
+                try:
+                    full_reply = await ai_router.generate(prompt, prompts=prompts)
+                except Exception as e:
+                    return idx, [], e
+
+            checked = await validate_reply(full_reply, lang)
+            failed = [(stage, message) for _, (status, stage, message) in checked if status == FAILED]
+            if checked and not failed:
+                response_cache.set(task, full_reply, namespace="code")
+                break
+            if attempt == CODE_REPAIR_ATTEMPTS:
+                if not checked:
+                    print(f"[Full AI reply was]:\n{full_reply}\n")
+                break
+
+            if checked:
+                stage, message = failed[0]
+                problem = f"The previous code failed the {stage} check:\n{message}"
+                print(f"Program {idx} failed the {stage} check; asking the AI to fix it.")
+            else:
+                problem = "The previous reply did not contain a code block."
+                print(f"Program {idx} had no code block; asking the AI again.")
+            prompt = f"{task}\n\n{problem}\n\nReply with the corrected, complete {lang} program in a single code block."
+            prompts, full_reply = None, None
+    return idx, checked, None
+
+async def generate_code(query, on_progress=None, force=False):
+    """Generates one or multiple code programs based on user query.
+
+    Tasks that already have a program in OUTPUT_DIR are answered from the program index
+    unless force is set or the query asks for a new one. The rest are generated
+    concurrently (CODE_GEN_CONCURRENCY at a time), checked in a process pool (see
+    validation.py) and each one is saved into OUTPUT_DIR and announced as soon as it is
+    ready. Progress messages go to on_progress; a summary of what was saved is returned.
+    """
+    def progress(message):
+        print(message)
+        if on_progress:
+            on_progress(message)
+
     lang, extension = detect_language(query)
     if not lang:
-        say("Sorry, I couldn't detect a programming language in your request.")
-        return
+        message = "Sorry, I couldn't detect a programming language in your request."
+        say(message)
+        return message
 
-    say(f"Generating {lang} programs. Please wait.")
     tasks = split_into_tasks(query)
-
+    force = force or bool(FORCE_REGENERATE.search(query.lower()))
+    saved = []
+    pending = []
+    loop = asyncio.get_running_loop()
     for idx, task in enumerate(tasks, start=1):
-        full_reply = ""
-
-        # Try Gemini first
-        try:
-            model = genai.GenerativeModel("gemini-2.0-flash")
-            response = model.generate_content(task)
-            full_reply = response.candidates[0].content.parts[0].text.strip()
-        except Exception as e:
-            print(f"Gemini AI failed for task {idx}: {e}")
-            say("Primary AI failed. Switching to backup AI, Mistral.")
-            try:
-                messages = [ChatMessage(role="user", content=f"Write {task}")]
-                response = await mistral_client.chat(model="mistral-medium", messages=messages)
-                full_reply = response.choices[0].message.content.strip()
-            except Exception as e:
-                print(f"Mistral AI failed for task {idx}: {e}")
-                say(f"Sorry, I'm unable to generate the program {idx} right now.")
-                continue
-
-        # Now extract only code part
-        code = extract_code_block(full_reply)
-
-        if code:
-            # Generate filename using the new function
-            filename = generate_filename(code, extension)
-
-            with open(filename, "w", encoding="utf-8") as f:
-                f.write(code)
-            say(f"Saved program {idx} as {filename}.")
-            print(f"\n[Saved CODE {idx} to {filename}]:\n\n{code}\n")
+        path = None if force else await loop.run_in_executor(None, program_index.lookup, extension, task)
+        if path:
+            saved.append(os.path.basename(path))
+            progress(f"Program {idx} already exists: {path}.")
+            say(f"Program {idx} is already saved as {os.path.basename(path)}.")
         else:
-            say(f"Sorry, I couldn't extract proper code for program {idx}.")
-            print(f"[Full AI reply was]:\n{full_reply}\n")
+            pending.append((idx, task))
+    if not pending:
+        return f"Found all {len(tasks)} {lang} program(s) in {OUTPUT_DIR}: {', '.join(saved)}."
 
-async def chat_with_mistral(query):
-    """Handles chat using Mistral AI."""
-    global chatStr
-    chatStr += f"User: {query}\nKai: "
-
-    try:
-        messages = [ChatMessage(role="user", content=query)]
-        response = await mistral_client.chat(model="mistral-medium", messages=messages)
-        reply = response.choices[0].message.content.strip()
-        say(reply)
-        chatStr += f"{reply}\n"
-        return reply
-    except Exception as e:
-        print(f"Mistral AI failed: {e}")
-        say("I'm facing technical difficulties. Please try again later.")
-        return "I'm facing an issue, please try again later."
-
-async def chat_with_ai(query):
-    """Uses Gemini AI first, then falls back to Mistral if needed."""
-    global chatStr
-    chatStr += f"User: {query}\nKai: "
+    limit = asyncio.Semaphore(CODE_GEN_CONCURRENCY)
+    jobs = [asyncio.ensure_future(generate_program(idx, task, limit, lang, force)) for idx, task in pending]
+    progress(f"Generating {len(pending)} {lang} program(s).")
+    say(f"Generating {lang} programs. Please wait.")
 
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        response = model.generate_content(query)
-        reply = response.candidates[0].content.parts[0].text.strip()
-
-        if is_code(reply):
-            print("\n[CODE OUTPUT]:\n")
-            print(reply)
-            say("Here is the code. Please check the terminal.")
+        for job in asyncio.as_completed(jobs):
+            idx, checked, error = await job
+            if error:
+                print(f"AI failed for task {idx}: {error}")
+                progress(f"Program {idx} failed.")
+                say(f"Sorry, I'm unable to generate the program {idx} right now.")
+                continue
 
-        chatStr += f"{reply}\n"
-        return reply
-    except Exception as e:
-        print(f"Gemini AI failed: {e}")
-        say("Primary AI failed. Switching to backup AI, Mistral.")
-        return await chat_with_mistral(query)
+            if not checked:
+                progress(f"Couldn't extract code for program {idx}.")
+                say(f"Sorry, I couldn't extract proper code for program {idx}.")
+                continue
 
-def get_weather(city="Hyderabad"):
-    """Fetches real-time weather information."""
-    url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={WEATHER_API_KEY}&units=metric"
+            task = tasks[idx - 1]
+            for code, (status, stage, message) in checked:
+                path = await loop.run_in_executor(
+                    None, save_program, OUTPUT_DIR, generate_filename(code, extension, task), code
+                )
+                await loop.run_in_executor(None, program_index.add, path, task, code, status)
+                filename = os.path.basename(path)
+                saved.append(filename)
+                note = f" It still fails the {stage} check." if status == FAILED else ""
+                progress(f"Saved program {idx} as {filename} ({status}).")
+                print(f"\n[Saved CODE {idx} to {path}]:\n\n{code}\n")
+                if status == FAILED:
+                    print(f"[{stage} check]:\n{message}\n")
+                say(f"Saved program {idx} as {filename}.{note}")
+    finally:
+        for job in jobs:
+            job.cancel()
+
+    if not saved:
+        return f"Sorry, I couldn't generate any {lang} programs."
+    return f"Saved {len(saved)} {lang} file(s) for {len(tasks)} program(s) in {OUTPUT_DIR}: {', '.join(saved)}."
+
+async def chat_with_ai(query, on_token=None, cache_ttl=CHAT_CACHE_TTL, remember=True):
+    """Uses Gemini AI first, then falls back to (or hedges with) Mistral via the provider router.
+
+    When on_token is given the reply is streamed to it as it is generated. Replies are
+    cached for cache_ttl seconds; pass 0 to bypass the cache. With remember the recent
+    conversation is sent as context and the exchange is added to it.
+    """
+    prompt = query
+    if remember:
+        if len(memory) and is_follow_up(query):
+            cache_ttl = 0  # The answer depends on the conversation so far
+        prompt = memory.build_prompt(query)
+
+    reply = response_cache.get(query, namespace="chat") if cache_ttl else None
+    if reply is not None:
+        if on_token:
+            on_token(reply)
+    else:
+        interrupted = False
+        try:
+            if on_token:
+                reply, interrupted = await stream_reply(ai_router, prompt, on_token)
+            else:
+                reply = await ai_router.generate(prompt)
+        except Exception as e:
+            print(f"AI providers failed: {e}")
+            say("I'm facing technical difficulties. Please try again later.")
+            return "I'm facing an issue, please try again later."
+        if not interrupted:  # A reply cut off mid-stream is shown once, never served again
+            response_cache.set(query, reply, namespace="chat", ttl=cache_ttl)
+
+    if is_code(reply):
+        print("\n[CODE OUTPUT]:\n")
+        print(reply)
+        say("Here is the code. Please check the terminal.")
+
+    if remember:
+        memory.add("user", query)
+        memory.add("assistant", reply)
+    return reply
+
+async def get_weather(city="Hyderabad"):
+    """Fetches real-time weather information (cached per city for a few minutes)."""
     try:
-        response = requests.get(url)
-        data = response.json()
-        if data.get("cod") == 200:
-            temp = data["main"]["temp"]
-            description = data["weather"][0]["description"]
-            return f"The temperature in {city} is {temp}°C with {description}."
-        else:
-            return f"Error: {data.get('message', 'Could not fetch weather details.')}"
+        with tracer.span("weather.fetch"):
+            temp, description = await weather_client.current(city)
+        return f"The temperature in {city} is {temp}°C with {description}."
+    except WeatherError as e:
+        return f"Error: {e}"
     except Exception as e:
         print(f"Weather API error: {e}")
         return "I am unable to retrieve the weather right now."
 
 def extract_city(query):
     """Extracts city name from the user's query."""
-    match = re.search(r"(?:weather|temperature) in ([a-zA-Z\s]+)", query)
+    match = CITY_PATTERN.search(" ".join(query.lower().split()))
     return match.group(1).strip().title() if match else "Hyderabad"
 
-def play_music():
-    """Open Spotify and play the last song automatically."""
-    os.system(SPOTIFY_CMD)
-    say("Opening Spotify. Enjoy your music!")
-
-    # Wait a few seconds to allow Spotify to open
-    time.sleep(5)
-
-    # Simulate pressing Spacebar (to start/resume music)
-    subprocess.run(["powershell", "-Command", "$wshell = New-Object -ComObject wscript.shell; $wshell.SendKeys(' ')"])
-
-def open_website(query):
-    """Opens a website based on user input."""
-    site = query.replace("open", "").strip().replace(" ", "")
-    url = f"https://www.{site}.com"
-    webbrowser.open(url)
-
-async def main(query):
-    """Processes single queries dynamically instead of an infinite loop."""
-    if query.lower() in ["exit", "quit", "stop", "shutdown", "kai quit"]:
-        return "Goodbye! Have a nice day!"
-
-    if "write a" in query and "program" in query:
-        return await generate_code(query)
-
-    if "open" in query:
-        open_website(query)
-        return f"Opening {query.replace('open', '').strip()}."
-
-    if "time" in query or "current time" in query:
-        return f"The time is {datetime.datetime.now().strftime('%I:%M %p')}"
-
-    if "date" in query or "current date" in query:
-        return f"Today's date is {datetime.datetime.now().strftime('%B %d, %Y')}"
-
-    if "play music" in query or "open music" in query:
-        play_music()
-        return "Playing music."
-
-    if any(keyword in query for keyword in ["weather in", "temperature in"]):
-        city = extract_city(query)
-        return get_weather(city)
-
-    return await process_query(query)  # Default fallback to AI processing
\ No newline at end of file
+async def play_music():
+    """Open Spotify (if it isn't running) and start playback as soon as it is ready; returns success."""
+    say("Opening Spotify. Enjoy your music!", cache=True)
+    if media.name == "none":
+        # Without a media backend there is nothing to poll or control: just start the app
+        return await launch(SPOTIFY_CMD, None)
+    if not await launch(SPOTIFY_CMD, media.is_ready, timeout=MUSIC_LAUNCH_TIMEOUT):
+        print("Spotify didn't start or wasn't ready in time.")
+        return False
+    if not await media.play():
+        print("Spotify is open but didn't accept the play command.")
+        return False
+    return True
+
+async def open_website(query):
+    """Opens a website based on user input; returns the URL."""
+    match = SITE_PATTERN.search(" ".join(query.lower().split()))
+    url = resolve_site(match.group(1) if match else query)
+    # Starting the browser can take a moment; keep it off the event loop
+    await asyncio.get_running_loop().run_in_executor(None, webbrowser.open, url)
+    return url
+
+async def warm_up():
+    """Load the heavy SDKs and clients in the background so the first query doesn't pay for them."""
+    loop = asyncio.get_running_loop()
+    warm_ups = [p.warm_up for p in ai_router.providers] + [weather_client.warm_up, search_client.warm_up]
+    for warm in warm_ups + [program_index.rescan]:
+        await loop.run_in_executor(None, warm)
+    tts.warm_up()
+
+async def close_clients():
+    """Release pooled connections and persist state (called when the engine shuts down)."""
+    global _validation_pool
+    await mistral.close()
+    await weather_client.close()
+    await search_client.close()
+    if _validation_pool is not None:
+        _validation_pool.shutdown(wait=False, cancel_futures=True)
+        _validation_pool = None
+    program_index.close()
+    if MEMORY_PATH:
+        memory.save(MEMORY_PATH)
+
+@kai_router.handler("exit")
+async def handle_exit(query, slots, **context):
+    return "Goodbye! Have a nice day!"
+
+@kai_router.handler("code")
+async def handle_code(query, slots, on_progress=None, **context):
+    return await generate_code(query, on_progress)
+
+@kai_router.handler("music")
+async def handle_music(query, slots, **context):
+    if DESKTOP_ACTIONS and not await play_music():
+        return "Sorry, I couldn't start Spotify."
+    return "Playing music."
+
+@kai_router.handler("open")
+async def handle_open(query, slots, **context):
+    if DESKTOP_ACTIONS:
+        await open_website(query)
+    return f"Opening {slots.get('site', 'it')}."
+
+@kai_router.handler("weather")
+async def handle_weather(query, slots, **context):
+    return await get_weather(extract_city(query))
+
+@kai_router.handler("date")
+async def handle_date(query, slots, **context):
+    return f"Today's date is {datetime.datetime.now().strftime('%B %d, %Y')}"
+
+@kai_router.handler("time")
+async def handle_time(query, slots, **context):
+    return f"The time is {datetime.datetime.now().strftime('%I:%M %p')}"
+
+@kai_router.handler("search")
+async def handle_search(query, slots, on_token=None, remember=True, **context):
+    return await search_web(query, on_token=on_token, remember=remember)
+
+@kai_router.handler("chat")
+async def handle_chat(query, slots, on_token=None, remember=True, **context):
+    return await chat_with_ai(query, on_token, remember=remember)
+
+async def main(query, on_token=None, on_progress=None, trace=None, remember=True):
+    """Processes single queries dynamically instead of an infinite loop.
+
+    The route is picked by the intent router (see intents.py). on_token, if given,
+    receives streamed reply text for AI-answered queries; on_progress receives status
+    messages from long-running tasks such as code generation. trace continues a trace
+    started earlier (e.g. at voice capture); otherwise one is started here when tracing is on.
+    remember=False answers without the conversation memory and leaves it untouched.
+    """
+    trace = trace or tracer.new_trace(query)
+    try:
+        with tracer.activate(trace):
+            return await kai_router.dispatch(query, on_token=on_token, on_progress=on_progress, remember=remember)
+    finally:
+        tracer.finish(trace)
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import re
+from collections import deque
+
+# Follow-up questions depend on earlier turns, so their replies must not be served from cache
+FOLLOW_UP = re.compile(r"\b(it|its|that|this|those|these|they|them|he|she|him|her|more|again|above|previous|earlier)\b")
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token) good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def is_follow_up(query):
+    return bool(FOLLOW_UP.search(query.lower()))
+
+
+class ConversationMemory:
+    """Bounded conversation history used to give the providers multi-turn context.
+
+    Turns live in a ring buffer. Once they exceed token_budget, the oldest ones are
+    summarized in the background (with summarizer, an async callable, or a local
+    fallback) and folded into a running summary.
+    """
+
+    def __init__(self, token_budget=1500, max_turns=50, summarizer=None):
+        self.token_budget = token_budget
+        self.turns = deque(maxlen=max_turns)
+        self.summary = ""
+        self.summarizer = summarizer
+        self._compaction = None
+
+    def __len__(self):
+        return len(self.turns)
+
+    def tokens(self):
+        return estimate_tokens(self.summary) + sum(turn["tokens"] for turn in self.turns)
+
+    def add(self, role, text):
+        """Record a turn; role is "user" or "assistant"."""
+        self.turns.append({"role": role, "text": text, "tokens": estimate_tokens(text)})
+        if self.tokens() > self.token_budget and self._compaction is None:
+            try:
+                self._compaction = asyncio.get_running_loop().create_task(self.compact())
+            except RuntimeError:
+                pass  # No loop (e.g. loading from a script); compact on the next add
+
+    async def compact(self):
+        """Summarize the oldest turns until the history fits in half the budget."""
+        try:
+            old = []
+            remaining = self.tokens()
+            for turn in self.turns:
+                if remaining <= self.token_budget // 2 or len(old) >= len(self.turns) - 2:
+                    break
+                old.append(turn)
+                remaining -= turn["tokens"]
+            if not old:
+                return
+
+            transcript = self._format(old)
+            if self.summary:
+                transcript = f"Earlier summary: {self.summary}\n{transcript}"
+            summary = None
+            if self.summarizer:
+                try:
+                    summary = await self.summarizer(transcript)
+                except Exception as e:
+                    print(f"Conversation summary failed: {e}")
+            self.summary = summary or self._local_summary(transcript)
+
+            # New turns were only appended meanwhile, so the summarized ones are still at the front
+            for turn in old:
+                if self.turns and self.turns[0] is turn:
+                    self.turns.popleft()
+        finally:
+            self._compaction = None
+
+    def _local_summary(self, transcript):
+        """Fallback when no model is available: keep the first sentence of each line, then trim."""
+        firsts = [re.split(r"(?<=[.!?])\s", line, maxsplit=1)[0] for line in transcript.splitlines() if line]
+        return " ".join(firsts)[-self.token_budget * 2:]
+
+    @staticmethod
+    def _format(turns):
+        return "\n".join(f"{'User' if t['role'] == 'user' else 'Kai'}: {t['text']}" for t in turns)
+
+    def build_prompt(self, query, context_budget=None):
+        """Prompt for the providers: summary and as many recent turns as fit, then the query."""
+        if not self.turns and not self.summary:
+            return query
+
+        budget = (context_budget or self.token_budget) - estimate_tokens(self.summary)
+        recent = []
+        for turn in reversed(self.turns):
+            if turn["tokens"] > budget:
+                break
+            recent.append(turn)
+            budget -= turn["tokens"]
+        recent.reverse()
+
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of the earlier conversation: {self.summary}")
+        if recent:
+            parts.append(self._format(recent))
+        parts.append(f"User: {query}\nKai:")
+        return "\n\n".join(parts)
+
+    def save(self, path):
+        data = {"summary": self.summary, "turns": list(self.turns)}
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.summary = data.get("summary", "")
+        self.turns.clear()
+        for turn in data.get("turns", []):
+            self.turns.append({"role": turn["role"], "text": turn["text"], "tokens": estimate_tokens(turn["text"])})
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+PROGRAM_INDEX_PATH = "kai_programs.db"
+
+# The names generate_filename builds file names from
+FUNCTION_PATTERN = re.compile(r"\bdef\s+(\w+)\s?\(")
+CLASS_PATTERN = re.compile(r"\bclass\s+(\w+)\s?")
+
+EXTENSION_LANGUAGES = {
+    ".py": "python", ".cpp": "c++", ".java": "java", ".c": "c", ".js": "javascript", ".html": "html",
+}
+
+# Words that don't change which program is being asked for
+TASK_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "for", "that", "which", "with", "using", "me",
+    "please", "can", "you", "could", "kai", "write", "create", "generate", "make", "implement",
+    "program", "programs", "code", "script", "function", "simple", "basic", "new", "fresh", "again",
+    "scratch", "from", "compute", "calculate", "find", "print", "display",
+    "python", "java", "javascript", "c", "c++", "cpp", "html",
+}
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS programs ("
+    "path TEXT PRIMARY KEY, language TEXT, task TEXT, task_key TEXT, content_hash TEXT, "
+    "entry_points TEXT, status TEXT, mtime REAL, size INTEGER, indexed_at REAL)",
+    "CREATE INDEX IF NOT EXISTS programs_task ON programs (language, task_key)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS programs_fts USING fts5(path UNINDEXED, task, entry_points)",
+]
+
+
+def task_terms(task):
+    words = re.findall(r"[a-z0-9+#]+", task.lower())
+    return sorted({word for word in words if word not in TASK_STOPWORDS})
+
+
+def normalize_task(task):
+    """Order-insensitive key: "write a python program for factorial" -> "factorial"."""
+    return " ".join(task_terms(task))
+
+
+def entry_points(code):
+    return list(dict.fromkeys(FUNCTION_PATTERN.findall(code) + CLASS_PATTERN.findall(code)))
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ProgramIndex:
+    """SQLite (FTS5) index of the programs in the outputs directory, for reuse without the AI.
+
+    Programs saved by generate_code are added with their task and validation status; files
+    that appear in the directory some other way are picked up by rescan(), which only reads
+    files whose size or mtime changed, so lookup() runs it every time. The database is opened
+    on first use; calls block on disk I/O, so async code runs them in an executor.
+    """
+
+    def __init__(self, path=PROGRAM_INDEX_PATH, directory="Outputs"):
+        self.path = path
+        self.directory = directory
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            for statement in SCHEMA:
+                self._db.execute(statement)
+            self._db.commit()
+        return self._db
+
+    def _upsert(self, db, path, language, task, digest, points, status, stat):
+        db.execute(
+            "INSERT OR REPLACE INTO programs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, language, task, normalize_task(task), digest, " ".join(points), status,
+             stat.st_mtime, stat.st_size, time.time()),
+        )
+        db.execute("DELETE FROM programs_fts WHERE path = ?", (path,))
+        db.execute("INSERT INTO programs_fts VALUES (?, ?, ?)", (path, task, " ".join(points)))
+
+    def add(self, path, task, code, status):
+        """Record a program generate_code just saved."""
+        language = EXTENSION_LANGUAGES.get(os.path.splitext(path)[1])
+        with self._lock:
+            db = self._connect()
+            self._upsert(db, path, language, task, content_hash(code.encode("utf-8")), entry_points(code),
+                         status, os.stat(path))
+            db.commit()
+
+    def rescan(self):
+        """Index new or changed files in the directory and forget deleted ones; returns how many changed."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            names = []
+        changed = 0
+        with self._lock:
+            db = self._connect()
+            known = {row[0]: row[1:] for row in db.execute("SELECT path, mtime, size, content_hash, task, status FROM programs")}
+            seen = set()
+            for name in names:
+                base, extension = os.path.splitext(name)
+                if name.startswith(".") or extension not in EXTENSION_LANGUAGES:
+                    continue
+                path = os.path.join(self.directory, name)
+                seen.add(path)
+                stat = os.stat(path)
+                previous = known.get(path)
+                if previous and previous[0] == stat.st_mtime and previous[1] == stat.st_size:
+                    continue
+                with open(path, "rb") as f:
+                    data = f.read()
+                digest = content_hash(data)
+                if previous and previous[2] == digest:
+                    task, status = previous[3], previous[4]
+                else:
+                    # Unknown origin (or edited): the file name is the best task description
+                    task = re.sub(r"_\d+$", "", base).replace("_", " ")
+                    status = "unchecked"
+                self._upsert(db, path, EXTENSION_LANGUAGES[extension], task, digest,
+                             entry_points(data.decode("utf-8", "replace")), status, stat)
+                changed += 1
+            for path in set(known) - seen:
+                db.execute("DELETE FROM programs WHERE path = ?", (path,))
+                db.execute("DELETE FROM programs_fts WHERE path = ?", (path,))
+                changed += 1
+            db.commit()
+        return changed
+
+    def lookup(self, extension, task):
+        """Path of an indexed program for the same task and language (not failing validation), or None."""
+        terms = task_terms(task)
+        if not terms:
+            return None
+        self.rescan()  # Only stats unchanged files; picks up programs added since the last call
+        language = EXTENSION_LANGUAGES.get(extension)
+        query = "task : (" + " AND ".join(f'"{term}"' for term in terms) + ")"
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT p.path, p.task_key, p.mtime, p.size FROM programs_fts JOIN programs p USING (path) "
+                "WHERE programs_fts MATCH ? AND p.language = ? AND p.status != 'failed' "
+                "ORDER BY bm25(programs_fts) LIMIT 20",
+                (query, language),
+            ).fetchall()
+        key = " ".join(terms)
+        for path, task_key, mtime, size in rows:
+            if task_key != key:
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if (stat.st_mtime, stat.st_size) == (mtime, size):
+                return path
+        return None
+
+    def search(self, text, limit=10):
+        """Full-text search over tasks and entry points; returns [(path, language, task, status)]."""
+        terms = re.findall(r"\w+", text.lower())
+        if not terms:
+            return []
+        query = " OR ".join(f'"{term}"' for term in terms)
+        with self._lock:
+            return self._connect().execute(
+                "SELECT p.path, p.language, p.task, p.status FROM programs_fts JOIN programs p USING (path) "
+                "WHERE programs_fts MATCH ? ORDER BY bm25(programs_fts) LIMIT ?",
+                (query, limit),
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,419 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from tracing import tracer
+
+GEMINI_MODEL = "gemini-2.0-flash"
+MISTRAL_MODEL = "mistral-medium"
+
+# Default limits shared by all providers
+MAX_CONCURRENT_REQUESTS = 4
+REQUEST_TIMEOUT = 30.0
+
+
+class Provider:
+    """Base class for a chat model that can be awaited from the engine loop."""
+
+    name = "provider"
+
+    def __init__(self, max_concurrency=MAX_CONCURRENT_REQUESTS, timeout=REQUEST_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def generate(self, prompt, timeout=None):
+        """Return the model reply for prompt, bounded by the concurrency limit and a timeout."""
+        async with self._semaphore:
+            return await asyncio.wait_for(self._generate(prompt), timeout or self.timeout)
+
+    async def stream(self, prompt, timeout=None):
+        """Yield reply text chunks as they arrive; the timeout applies to each chunk."""
+        timeout = timeout or self.timeout
+        async with self._semaphore:
+            chunks = self._stream(prompt)
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
+                    if chunk:
+                        yield chunk
+            finally:
+                await chunks.aclose()
+
+    def warm_up(self):
+        """Import the SDK and build the client now instead of on the first request."""
+
+    async def close(self):
+        """Release the SDK client's connections, if it holds any."""
+
+    async def _generate(self, prompt):
+        raise NotImplementedError
+
+    async def _stream(self, prompt):
+        # Providers without native streaming deliver the whole reply as one chunk
+        yield await self._generate(prompt)
+
+
+class GeminiProvider(Provider):
+    """Gemini through the SDK's async API, reusing one GenerativeModel.
+
+    The SDK is imported and configured on first use (or by warm_up()).
+    """
+
+    name = "gemini"
+
+    def __init__(self, api_key, model_name=GEMINI_MODEL, executor_workers=None, **kwargs):
+        super().__init__(**kwargs)
+        self.api_key = api_key
+        self.model_name = model_name
+        self._model = None
+        # Optional fallback: run the sync client on a bounded thread pool instead
+        self.executor = ThreadPoolExecutor(executor_workers, thread_name_prefix="gemini") if executor_workers else None
+
+    @property
+    def model(self):
+        if self._model is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def warm_up(self):
+        self.model
+
+    async def _generate(self, prompt):
+        if self.executor:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self.executor, self.model.generate_content, prompt)
+        else:
+            response = await self.model.generate_content_async(prompt)
+        return response.candidates[0].content.parts[0].text.strip()
+
+    async def _stream(self, prompt):
+        if self.executor:
+            yield await self._generate(prompt)
+            return
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+
+class MistralProvider(Provider):
+    """Mistral through one shared MistralAsyncClient, created on first use (or by warm_up())."""
+
+    name = "mistral"
+
+    def __init__(self, api_key, model_name=MISTRAL_MODEL, **kwargs):
+        super().__init__(**kwargs)
+        self.api_key = api_key
+        self.model_name = model_name
+        self._client = None
+        self._message = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from mistralai.async_client import MistralAsyncClient
+            from mistralai.models.chat_completion import ChatMessage
+
+            self._message = ChatMessage
+            self._client = MistralAsyncClient(api_key=self.api_key)
+        return self._client
+
+    def warm_up(self):
+        self.client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def _generate(self, prompt):
+        client = self.client
+        messages = [self._message(role="user", content=prompt)]
+        response = await client.chat(model=self.model_name, messages=messages)
+        return response.choices[0].message.content.strip()
+
+    async def _stream(self, prompt):
+        client = self.client
+        messages = [self._message(role="user", content=prompt)]
+        async for chunk in client.chat_stream(model=self.model_name, messages=messages):
+            yield chunk.choices[0].delta.content or ""
+
+
+class ProviderError(Exception):
+    """Raised when no provider could answer a request."""
+
+
+class ProviderStats:
+    """Rolling latency samples and error counters for one provider."""
+
+    def __init__(self, window=200):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.hedges_lost = 0
+
+    def record(self, latency, error=None, lost=False):
+        """lost: cancelled after a hedged backup answered first; latency is then a lower bound."""
+        self.requests += 1
+        self.hedges_lost += lost
+        if error is None:
+            self.latencies.append(latency)
+        else:
+            self.failures += 1
+            if isinstance(error, asyncio.TimeoutError):
+                self.timeouts += 1
+
+    def percentile(self, pct):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def snapshot(self):
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "hedges_lost": self.hedges_lost,
+            "error_rate": self.failures / self.requests if self.requests else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+        }
+
+
+class CircuitBreaker:
+    """Stops calling a provider after repeated failures, probing it again after a cool-down."""
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """True if a request may be sent now; in half-open state one probe is let through per cool-down."""
+        state = self.state
+        if state == "half-open":
+            self.opened_at = time.monotonic()  # Re-arm so concurrent requests keep failing fast
+            return True
+        return state == "closed"
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class ProviderRouter:
+    """Sends requests to the first healthy provider, failing over (or hedging) to the next.
+
+    With hedge=True the backup is started when the primary has not answered within its
+    observed p95 latency, and whichever reply arrives first wins.
+    """
+
+    name = "router"
+
+    def __init__(self, providers, hedge=False, hedge_delay=2.0, min_hedge_delay=0.5,
+                 min_samples=20, on_failover=None, **breaker_options):
+        self.providers = list(providers)
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay  # Used until a provider has min_samples latencies
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.on_failover = on_failover
+        self.breakers = {p.name: CircuitBreaker(**breaker_options) for p in self.providers}
+        self.provider_stats = {p.name: ProviderStats() for p in self.providers}
+
+    def stats(self):
+        """Per-provider latency/error statistics and breaker state."""
+        return {
+            name: dict(stats.snapshot(), breaker=self.breakers[name].state)
+            for name, stats in self.provider_stats.items()
+        }
+
+    def _next_available(self, queue):
+        """Pop providers off queue until one whose breaker lets a request through."""
+        while queue:
+            provider = queue.pop(0)
+            if self.breakers[provider.name].allow():
+                return provider
+        return None
+
+    def _record(self, provider, started, error=None, lost=False):
+        """lost marks a provider a later-started backup beat: its time so far is sampled (so
+        the hedge deadline sees the slow tail) and it counts against the breaker."""
+        finished = time.monotonic()
+        self.provider_stats[provider.name].record(finished - started, error, lost)
+        if tracer.enabled:
+            attrs = {"error": type(error).__name__} if error is not None else {}
+            if lost:
+                attrs["outcome"] = "lost hedge"
+            tracer.record("provider." + provider.name, started, finished, **attrs)
+        if error is None and not lost:
+            self.breakers[provider.name].record_success()
+        else:
+            self.breakers[provider.name].record_failure()
+
+    def _record_losers(self, running, winner_started):
+        """Record the still-running providers started before the winner (about to be cancelled)."""
+        for entry in running.values():
+            provider, started = entry[0], entry[-1]
+            if started < winner_started:
+                self._record(provider, started, lost=True)
+
+    def _deadline(self, provider):
+        stats = self.provider_stats[provider.name]
+        if len(stats.latencies) < self.min_samples:
+            return self.hedge_delay
+        return max(self.min_hedge_delay, stats.percentile(95))
+
+    def _failover(self, failed, backup, reason):
+        print(f"{failed.name} {reason}; using {backup.name}.")
+        if self.on_failover:
+            self.on_failover(failed, backup, reason)
+
+    async def _call(self, provider, prompt, timeout):
+        started = time.monotonic()
+        try:
+            reply = await provider.generate(prompt, timeout)
+        except Exception as e:
+            self._record(provider, started, e)
+            raise
+        self._record(provider, started)
+        return reply
+
+    async def generate(self, prompt, prompts=None, timeout=None):
+        """Return the first successful reply; prompts can override the prompt per provider name."""
+        queue = list(self.providers)
+        prompts = prompts or {}
+        running = {}
+        errors = []
+
+        def launch():
+            provider = self._next_available(queue)
+            if provider:
+                task = asyncio.ensure_future(self._call(provider, prompts.get(provider.name, prompt), timeout))
+                running[task] = (provider, time.monotonic())
+            return provider
+
+        current = launch()
+        if current is None:
+            raise ProviderError("No AI provider is available right now.")
+        try:
+            while running:
+                deadline = self._deadline(current) if self.hedge and queue else None
+                done, _ = await asyncio.wait(running, timeout=deadline, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    backup = launch()
+                    if backup:
+                        self._failover(current, backup, "is slow")
+                        current = backup
+                    continue
+
+                for task in done:
+                    provider, started = running.pop(task)
+                    if task.exception() is None:
+                        self._record_losers(running, started)
+                        return task.result()
+                    errors.append(task.exception())
+                    print(f"{provider.name} failed: {task.exception()}")
+
+                if not running:
+                    backup = launch()
+                    if backup:
+                        self._failover(provider, backup, "failed")
+                        current = backup
+        finally:
+            for task in running:
+                task.cancel()
+
+        raise errors[-1] if errors else ProviderError("No AI provider is available right now.")
+
+    async def stream(self, prompt, prompts=None, timeout=None):
+        """Stream from the first healthy provider, failing over (or hedging) only before the first chunk.
+
+        With hedge=True the backup is started when the primary has not sent its first chunk
+        within its observed p95 latency; the first provider to send one is streamed.
+        """
+        queue = list(self.providers)
+        prompts = prompts or {}
+        running = {}
+        errors = []
+
+        def launch():
+            provider = self._next_available(queue)
+            if provider:
+                chunks = provider.stream(prompts.get(provider.name, prompt), timeout).__aiter__()
+                task = asyncio.ensure_future(chunks.__anext__())
+                running[task] = (provider, chunks, time.monotonic())
+            return provider
+
+        current = launch()
+        if current is None:
+            raise ProviderError("No AI provider is available right now.")
+        winner = None
+        try:
+            while running and winner is None:
+                deadline = self._deadline(current) if self.hedge and queue else None
+                done, _ = await asyncio.wait(running, timeout=deadline, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    backup = launch()
+                    if backup:
+                        self._failover(current, backup, "is slow")
+                        current = backup
+                    continue
+
+                for task in done:
+                    provider, chunks, started = running.pop(task)
+                    error = task.exception()
+                    if error is None or isinstance(error, StopAsyncIteration):
+                        self._record_losers(running, started)
+                        first = None if error else task.result()
+                        winner = provider, chunks, started, first
+                        break
+                    self._record(provider, started, error)
+                    errors.append(error)
+                    print(f"{provider.name} failed: {error}")
+
+                if winner is None and not running:
+                    backup = launch()
+                    if backup:
+                        self._failover(provider, backup, "failed")
+                        current = backup
+        finally:
+            for task in running:
+                task.cancel()
+
+        if winner is None:
+            raise errors[-1] if errors else ProviderError("No AI provider is available right now.")
+
+        provider, chunks, started, first = winner
+        tracer.record(f"provider.{provider.name}.first_token", started, time.monotonic())
+        try:
+            if first is not None:
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+        except Exception as e:
+            self._record(provider, started, e)
+            raise
+        self._record(provider, started)
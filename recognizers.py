@@ -0,0 +1,114 @@
+import json
+import os
+
+VOSK_MODEL_PATH = os.path.join("models", "vosk-model-small-en-in-0.4")
+
+
+class SpeechBackend:
+    """Incremental recognizer interface used by VoiceCapture.
+
+    start() begins an utterance, accept(frame) feeds 16-bit mono PCM and may return a
+    partial hypothesis, finish() returns the final transcript. Failures raise the
+    speech_recognition exceptions (UnknownValueError / RequestError).
+    """
+
+    name = "backend"
+
+    def __init__(self, sample_rate, sample_width=2):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self._frames = []
+
+    def start(self):
+        self._frames = []
+
+    def accept(self, frame):
+        self._frames.append(frame)
+        return None
+
+    def finish(self):
+        import speech_recognition as sr
+
+        audio = sr.AudioData(b"".join(self._frames), self.sample_rate, self.sample_width)
+        self._frames = []
+        return self.transcribe(audio)
+
+    def transcribe(self, audio):
+        raise NotImplementedError
+
+
+class GoogleBackend(SpeechBackend):
+    """Google Web Speech API: one request per finished utterance, no partials."""
+
+    name = "google"
+
+    def __init__(self, sample_rate, sample_width=2, language="en-in"):
+        super().__init__(sample_rate, sample_width)
+        import speech_recognition as sr
+
+        self.language = language
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, audio):
+        return self.recognizer.recognize_google(audio, language=self.language)
+
+
+class VoskBackend(SpeechBackend):
+    """Offline, CPU-only recognition with Vosk, streaming partial hypotheses while the user speaks."""
+
+    name = "vosk"
+
+    def __init__(self, sample_rate, sample_width=2, model_path=VOSK_MODEL_PATH):
+        super().__init__(sample_rate, sample_width)
+        import vosk  # Optional dependency, only needed for offline recognition
+
+        if not os.path.isdir(model_path):
+            raise FileNotFoundError(f"Vosk model not found at {model_path}")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model = vosk.Model(model_path)
+        self._recognizer = None
+        self._segments = []
+
+    def start(self):
+        self._recognizer = self._vosk.KaldiRecognizer(self.model, self.sample_rate)
+        self._segments = []
+
+    def accept(self, frame):
+        # Vosk may close a segment mid-utterance; keep it and keep going
+        if self._recognizer.AcceptWaveform(frame):
+            self._segments.append(json.loads(self._recognizer.Result()).get("text", ""))
+            partial = ""
+        else:
+            partial = json.loads(self._recognizer.PartialResult()).get("partial", "")
+        return " ".join(s for s in self._segments + [partial] if s) or None
+
+    def finish(self):
+        self._segments.append(json.loads(self._recognizer.FinalResult()).get("text", ""))
+        text = " ".join(s for s in self._segments if s)
+        self._recognizer = None
+        self._segments = []
+        if not text:
+            import speech_recognition as sr
+
+            raise sr.UnknownValueError()
+        return text
+
+    def transcribe(self, audio):
+        self.start()
+        self.accept(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+        return self.finish()
+
+
+BACKENDS = {"google": GoogleBackend, "vosk": VoskBackend}
+
+
+def make_backend(name, sample_rate, language="en-in"):
+    """Build the named backend, falling back to Google when the offline engine is unavailable."""
+    try:
+        if name == "vosk":
+            return VoskBackend(sample_rate)
+        return BACKENDS[name](sample_rate, language=language)
+    except (ImportError, FileNotFoundError) as e:
+        print(f"Speech backend {name!r} unavailable ({e}); using Google.")
+        return GoogleBackend(sample_rate, language=language)
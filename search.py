@@ -0,0 +1,103 @@
+import asyncio
+import json
+import re
+from collections import Counter
+from cache import ResponseCache, SEARCH_CACHE_TTL
+
+SERPAPI_URL = "https://serpapi.com"
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "is", "are", "was", "were", "be",
+    "by", "with", "at", "from", "as", "it", "its", "this", "that", "who", "what", "when", "which",
+}
+
+
+class SearchClient:
+    """SerpAPI Google search over a pooled HTTP session, with a short-lived result cache.
+
+    Identical searches that are already in flight share a single request.
+    """
+
+    def __init__(self, api_key, base_url=SERPAPI_URL, location="India", hl="en", gl="in",
+                 ttl=SEARCH_CACHE_TTL, max_results=5, timeout=10.0):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.defaults = {"location": location, "hl": hl, "gl": gl}
+        self.max_results = max_results
+        self.timeout = timeout
+        self.cache = ResponseCache(max_entries=128, ttl=ttl)
+        self._http = None
+        self._in_flight = {}
+
+    def _session(self):
+        if self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(base_url=self.base_url, timeout=httpx.Timeout(self.timeout, connect=3.0))
+        return self._http
+
+    def warm_up(self):
+        self._session()
+
+    async def _fetch(self, params):
+        response = await self._session().get("/search.json", params=dict(params, engine="google", api_key=self.api_key))
+        response.raise_for_status()
+        results = response.json().get("organic_results") or []
+        return [r["snippet"] for r in results[:self.max_results] if r.get("snippet")]
+
+    async def search(self, query, **overrides):
+        """Return up to max_results snippets for query; location/hl/gl can be overridden per call."""
+        params = dict(self.defaults, **overrides)
+        namespace = "search:{location}:{hl}:{gl}".format(**params)
+
+        cached = self.cache.get(query, namespace=namespace)
+        if cached is not None:
+            return json.loads(cached)
+
+        key = self.cache.key(query, namespace)
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(dict(params, q=query)))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        snippets = await asyncio.shield(task)
+        self.cache.set(query, json.dumps(snippets), namespace=namespace)
+        return snippets
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+def _words(text):
+    return [w for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOPWORDS]
+
+
+def summarize_snippets(query, snippets, max_sentences=3):
+    """Condense search snippets locally by extractive ranking (no model call).
+
+    Sentences score by overlap with the query plus how often their words recur across
+    all snippets; the best ones are returned in their original order.
+    """
+    sentences = []
+    for snippet in dict.fromkeys(snippets):  # Drop duplicates, keep order
+        for sentence in re.split(r"(?<=[.!?])\s+", snippet.replace("...", ".").strip()):
+            sentence = sentence.strip(" .")
+            if len(sentence.split()) >= 4 and sentence not in sentences:
+                sentences.append(sentence)
+    if not sentences:
+        return " ".join(snippets[:1])
+
+    query_words = set(_words(query))
+    frequency = Counter(w for s in sentences for w in set(_words(s)))
+
+    def score(index):
+        words = set(_words(sentences[index]))
+        if not words:
+            return 0.0
+        centrality = sum(frequency[w] for w in words) / len(words)
+        return 2 * len(words & query_words) + centrality
+
+    best = sorted(range(len(sentences)), key=lambda i: (-score(i), i))[:max_sentences]
+    return " ".join(sentences[i] + "." for i in sorted(best))
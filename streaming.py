@@ -0,0 +1,52 @@
+import re
+
+# A sentence ends at . ! ? (optionally followed by quotes/brackets) and whitespace, or at a line break
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n+")
+
+
+class SentenceChunker:
+    """Turns a stream of tokens into complete sentences for text-to-speech."""
+
+    def __init__(self, min_chars=20):
+        self.min_chars = min_chars  # Very short fragments are merged so speech isn't choppy
+        self.buffer = ""
+
+    def feed(self, text):
+        """Add streamed text and return the sentences it completed."""
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            candidate = self.buffer[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Return whatever is left once the stream has finished."""
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return rest
+
+
+async def stream_reply(provider, prompt, on_token):
+    """Stream a provider reply into on_token; returns (full text, interrupted).
+
+    Errors before the first token are raised so the caller can fall back to another
+    provider; errors after that keep the partial reply that was already delivered and
+    set interrupted, so the caller knows not to cache it.
+    """
+    parts = []
+    interrupted = False
+    try:
+        async for chunk in provider.stream(prompt):
+            parts.append(chunk)
+            on_token(chunk)
+    except Exception as e:
+        if not parts:
+            raise
+        print(f"{provider.name} stream interrupted: {e}")
+        interrupted = True
+    return "".join(parts).strip(), interrupted
@@ -0,0 +1,264 @@
+"""Lightweight per-query tracing: monotonic spans, trace IDs and latency histograms.
+
+Disabled by default; while disabled, span() hands back a shared no-op context manager and
+new_trace() returns None, so instrumented code pays for little more than an attribute check.
+The current trace travels with the asyncio task (contextvars); code running on other threads
+(voice capture, TTS) passes the trace along explicitly.
+"""
+import bisect
+import contextvars
+import itertools
+import json
+import threading
+import time
+from collections import deque
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current = contextvars.ContextVar("kai_trace", default=None)
+_trace_ids = itertools.count(1)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(upper bound, observations <= bound)] including +Inf, as Prometheus expects."""
+        return list(zip([*map(str, self.buckets), "+Inf"], itertools.accumulate(self.counts)))
+
+
+class HistogramRegistry:
+    """Histograms keyed by metric name and labels; exportable as JSON or Prometheus text."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def to_json(self):
+        with self._lock:
+            items = sorted(self._histograms.items())
+            return json.dumps([
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": round(histogram.sum, 6),
+                    "buckets": dict(histogram.cumulative()),
+                }
+                for (name, labels), histogram in items
+            ], indent=2)
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            items = sorted(self._histograms.items())
+            described = set()
+            for (name, labels), histogram in items:
+                if name not in described:
+                    described.add(name)
+                    lines.append(f"# TYPE {name} histogram")
+                label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+                prefix = label_text + "," if label_text else ""
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {count}')
+                suffix = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{name}_sum{suffix} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{suffix} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+class Span:
+    __slots__ = ("name", "start", "end", "attrs")
+
+    def __init__(self, name, start, end, attrs):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.attrs = attrs
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+
+class Trace:
+    """All spans of one query: capture, routing, provider calls and the speech of its reply."""
+
+    def __init__(self, name, start=None, **attrs):
+        self.trace_id = f"{next(_trace_ids):06x}"
+        self.name = name
+        self.start = time.monotonic() if start is None else start
+        self.end = None
+        self.attrs = attrs
+        self.spans = []
+
+    @property
+    def duration(self):
+        return (self.end or time.monotonic()) - self.start
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "duration_ms": round(self.duration * 1000, 1),
+            "attrs": self.attrs,
+            "spans": [
+                {
+                    "name": span.name,
+                    "offset_ms": round((span.start - self.start) * 1000, 1),
+                    "duration_ms": round(span.duration * 1000, 1),
+                    **span.attrs,
+                }
+                for span in sorted(self.spans, key=lambda span: span.start)
+            ],
+        }
+
+    def format(self):
+        """Multi-line summary for the debug pane."""
+        intent = self.attrs.get("intent", "?")
+        state = "" if self.end else " (running)"
+        lines = [f"#{self.trace_id} [{intent}] {self.name[:50]!r} {self.duration * 1000:.0f} ms{state}"]
+        for span in sorted(self.spans, key=lambda span: span.start):
+            extra = " ".join(f"{key}={value}" for key, value in span.attrs.items())
+            lines.append(
+                f"    {span.name:<28} +{(span.start - self.start) * 1000:7.0f} ms {span.duration * 1000:8.1f} ms  {extra}"
+            )
+        return "\n".join(lines)
+
+
+class _NullSpan:
+    """Returned while tracing is off; does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _SpanContext:
+    __slots__ = ("tracer", "name", "attrs", "trace", "start")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.trace = _current.get()
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.start, time.monotonic(), self.trace, **self.attrs)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class _Activation:
+    __slots__ = ("trace", "token")
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def __enter__(self):
+        self.token = _current.set(self.trace)
+        return self.trace
+
+    def __exit__(self, *exc):
+        _current.reset(self.token)
+        return False
+
+
+class Tracer:
+    """Creates traces and spans and feeds span durations into the histogram registry.
+
+    Stage durations are observed as kai_stage_seconds{stage=...} and whole queries as
+    kai_query_seconds{intent=...}. The last max_traces traces are kept for inspection.
+    """
+
+    def __init__(self, enabled=False, max_traces=50):
+        self.enabled = enabled
+        self.registry = HistogramRegistry()
+        self.traces = deque(maxlen=max_traces)
+        self.version = 0  # Bumped on every change, so viewers can skip redrawing
+
+    def new_trace(self, name, start=None, **attrs):
+        """Start a trace (None while disabled)."""
+        if not self.enabled:
+            return None
+        trace = Trace(name, start, **attrs)
+        self.traces.append(trace)
+        self.version += 1
+        return trace
+
+    def current(self):
+        return _current.get()
+
+    def activate(self, trace):
+        """Make trace the current one for the enclosed code (and tasks it creates)."""
+        return _Activation(trace) if trace is not None else NULL_SPAN
+
+    def span(self, name, **attrs):
+        """Time the enclosed block as a stage of the current trace."""
+        if not self.enabled:
+            return NULL_SPAN
+        return _SpanContext(self, name, attrs)
+
+    def record(self, name, start, end, trace=None, **attrs):
+        """Record a stage measured elsewhere (monotonic start/end); trace defaults to the current one."""
+        if not self.enabled:
+            return
+        self.registry.observe("kai_stage_seconds", end - start, stage=name)
+        trace = trace or _current.get()
+        if trace is not None:
+            trace.spans.append(Span(name, start, end, attrs))
+            self.version += 1
+
+    def finish(self, trace):
+        if trace is None or trace.end is not None:
+            return
+        trace.end = time.monotonic()
+        self.registry.observe("kai_query_seconds", trace.duration, intent=trace.attrs.get("intent", "unknown"))
+        self.version += 1
+
+    def recent(self, limit=None):
+        """Most recent traces first, as dicts."""
+        traces = list(self.traces)[::-1][:limit]
+        return [trace.to_dict() for trace in traces]
+
+
+tracer = Tracer()
@@ -0,0 +1,45 @@
+import json
+import os
+
+TRANSCRIPT_LOG = "kai_transcript.log"
+
+
+class TranscriptLog:
+    """Disk-backed stack of chat messages paged out of the chat area.
+
+    Messages trimmed from the top of the chat are pushed (oldest first); scrolling up pops
+    the newest page back. Only byte offsets are kept in memory, one per message.
+    """
+
+    def __init__(self, path=TRANSCRIPT_LOG):
+        self.path = path
+        self._offsets = []
+        open(self.path, "wb").close()  # Each session starts a fresh log
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def push(self, messages):
+        if not messages:
+            return
+        with open(self.path, "ab") as f:
+            f.seek(0, os.SEEK_END)
+            for message in messages:
+                self._offsets.append(f.tell())
+                f.write(json.dumps(message).encode("ascii") + b"\n")
+
+    def pop(self, count):
+        """Remove and return up to count of the most recently pushed messages, oldest first."""
+        if not self._offsets:
+            return []
+        start = self._offsets[-min(count, len(self._offsets))]
+        with open(self.path, "r+b") as f:
+            f.seek(start)
+            messages = [json.loads(line) for line in f.read().splitlines()]
+            f.truncate(start)
+        del self._offsets[-len(messages):]
+        return messages
+
+    def clear(self):
+        self._offsets = []
+        open(self.path, "wb").close()
@@ -0,0 +1,214 @@
+import hashlib
+import itertools
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from tracing import tracer
+
+try:
+    import winsound
+except ImportError:  # Not on Windows: use a command-line player if one exists
+    winsound = None
+
+# Spoken priorities: lower runs first
+URGENT, NORMAL, BACKGROUND = 0, 5, 9
+
+TTS_CACHE_DIR = "tts_cache"
+
+# Announcements rendered ahead of time so they play without synthesis
+FIXED_PHRASES = [
+    "Primary AI failed. Switching to backup AI, Mistral.",
+    "Opening Spotify. Enjoy your music!",
+    "I'm facing technical difficulties. Please try again later.",
+    "Here is the code. Please check the terminal.",
+    "Sorry, I couldn't detect a programming language in your request.",
+]
+
+
+class PhraseCache:
+    """On-disk LRU of rendered phrases (file mtime is the recency)."""
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_files=64, voice_key=""):
+        self.directory = directory
+        self.max_files = max_files
+        self.voice_key = voice_key  # Rate/voice settings, so a change re-renders
+
+    def path(self, text):
+        digest = hashlib.sha1(f"{self.voice_key}|{text}".encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.directory, f"{digest}.wav")
+
+    def get(self, text):
+        path = self.path(text)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        return path
+
+    def evict(self):
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".wav") and ".tmp." not in name]
+        files.sort(key=os.path.getmtime, reverse=True)
+        for path in files[self.max_files:]:
+            os.remove(path)
+
+
+class TTSService:
+    """Owns the single pyttsx3 engine on a dedicated thread, fed by a priority queue.
+
+    speak() never blocks: it queues text and returns. stop() interrupts the current
+    utterance and drops everything queued (used for "Stop Speaking" and barge-in).
+    Phrases that have been rendered to the phrase cache are played back instead of
+    being synthesized again.
+    """
+
+    def __init__(self, rate=175, volume=1.0, cache_dir=TTS_CACHE_DIR, prerender=FIXED_PHRASES):
+        self.rate = rate
+        self.volume = volume
+        self.enabled = True
+        self.phrases = PhraseCache(cache_dir, voice_key=f"{rate}:{volume}")
+        self.prerender = list(prerender)
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._generation = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._engine = None
+        self._player = None
+        self._busy = False
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="kai-tts", daemon=True)
+                self._thread.start()
+                for phrase in self.prerender:
+                    self._put(BACKGROUND, "render", phrase)
+
+    def _put(self, priority, kind, text, trace=None):
+        self._queue.put((priority, next(self._order), self._generation, kind, text, trace, time.monotonic()))
+
+    def speak(self, text, priority=NORMAL, interrupt=False, cache=False, trace=None):
+        """Queue text; interrupt=True first stops whatever is playing or queued.
+
+        cache=True also renders the phrase to disk (in the background) for instant replay.
+        Queueing and speaking time is recorded on trace (default: the current trace).
+        """
+        if not text or not self.enabled:
+            return
+        if interrupt:
+            self.stop()
+        self._ensure_started()
+        with self._lock:
+            if not self.enabled:  # The engine failed to start
+                return
+            self._pending += 1
+        self._put(priority, "speak", text, trace or tracer.current())
+        if cache:
+            self._put(BACKGROUND, "render", text)
+
+    def is_speaking(self):
+        return self._pending > 0
+
+    def stop(self):
+        """Interrupt the current utterance and drop queued ones."""
+        self._generation += 1
+        if not self._busy:
+            return
+        player = self._player
+        if player is False:
+            winsound.PlaySound(None, 0)  # Stops the sound playing on the TTS thread
+        elif player is not None:
+            player.terminate()
+        elif self._engine is not None:
+            self._engine.stop()
+
+    def shutdown(self):
+        if self._thread is not None:
+            self.stop()
+            self._queue.put((-1, -1, -1, "quit", None, None, 0.0))
+
+    def warm_up(self):
+        """Start the TTS thread (engine init and phrase rendering) ahead of the first reply."""
+        self._ensure_started()
+
+    def _run(self):
+        try:
+            import pyttsx3  # Deferred so importing Kai stays fast
+
+            self._engine = pyttsx3.init()
+            self._engine.setProperty("rate", self.rate)
+            self._engine.setProperty("volume", self.volume)
+        except Exception as e:
+            # No speech for this session; nothing may stay "speaking" (that would mute the mic)
+            print(f"Text-to-speech is unavailable: {e}")
+            with self._lock:
+                self.enabled = False
+                self._pending = 0
+            return
+
+        while True:
+            _, _, generation, kind, text, trace, queued_at = self._queue.get()
+            if kind == "quit":
+                break
+            if kind == "render":
+                self._render(text)
+                continue
+            try:
+                if generation == self._generation:
+                    self._busy = True
+                    started = time.monotonic()
+                    tracer.record("tts.queue", queued_at, started, trace)
+                    path = self.phrases.get(text)
+                    cached = bool(path and self._play(path))
+                    if not cached:
+                        self._engine.say(text)
+                        self._engine.runAndWait()
+                    tracer.record("tts.speak", started, time.monotonic(), trace, cached=cached)
+            except RuntimeError:
+                pass
+            finally:
+                self._busy = False
+                with self._lock:
+                    self._pending -= 1
+
+    def _render(self, text):
+        """Synthesize a phrase into the cache (runs on the TTS thread between utterances)."""
+        if self.phrases.get(text):
+            return
+        try:
+            os.makedirs(self.phrases.directory, exist_ok=True)
+            path = self.phrases.path(text)
+            tmp = path + ".tmp.wav"
+            self._engine.save_to_file(text, tmp)
+            self._engine.runAndWait()
+            if os.path.exists(tmp) and os.path.getsize(tmp) > 0:
+                os.replace(tmp, path)
+                self.phrases.evict()
+        except (OSError, RuntimeError) as e:
+            print(f"Could not cache phrase {text!r}: {e}")
+
+    def _play(self, path):
+        """Play a cached wav; returns False when no player is available."""
+        if winsound is not None:
+            self._player = False  # Marks winsound playback for stop()
+            try:
+                winsound.PlaySound(path, winsound.SND_FILENAME)
+            finally:
+                self._player = None
+            return True
+
+        player = shutil.which("paplay") or shutil.which("aplay") or shutil.which("afplay")
+        if not player:
+            return False
+        self._player = subprocess.Popen([player, path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            self._player.wait()
+        finally:
+            self._player = None
+        return True
+
+
+tts = TTSService()
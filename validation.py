@@ -0,0 +1,189 @@
+"""Checks for generated programs, run in worker processes so they never block the assistant.
+
+check_program() is a plain top-level function (picklable for ProcessPoolExecutor): it
+compiles the code with the language's own tool when one is installed and can optionally
+run it as a smoke test. Results are (status, stage, message) with status "passed",
+"failed" or "unchecked" (no tool for the language).
+"""
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+try:
+    import resource
+except ImportError:  # Windows: smoke tests are bounded by the timeout only
+    resource = None
+
+PASSED, FAILED, UNCHECKED = "passed", "failed", "unchecked"
+
+FENCE_PATTERN = re.compile(r"```[ \t]*([\w+#.-]*)[^\n]*\n(.*?)```", re.DOTALL)
+
+# Fence tags that mean the same language as detect_language's names
+LANGUAGE_TAGS = {
+    "python": {"python", "py", "python3"},
+    "c++": {"c++", "cpp", "cxx", "cc"},
+    "cpp": {"c++", "cpp", "cxx", "cc"},
+    "java": {"java"},
+    "c": {"c", "h"},
+    "javascript": {"javascript", "js", "node"},
+    "html": {"html", "htm"},
+}
+
+SMOKE_MEMORY_LIMIT = 512 * 1024 * 1024
+MAX_ERROR_CHARS = 800
+
+
+def extract_code_blocks(text, language=None):
+    """All fenced blocks in text as (tag, code).
+
+    With language, only the blocks tagged for it; untagged blocks count only when none
+    are, since replies often close with an untagged "Sample output" block.
+    """
+    blocks = [(tag.lower(), code.strip()) for tag, code in FENCE_PATTERN.findall(text)]
+    blocks = [(tag, code) for tag, code in blocks if code]
+    if language:
+        tags = LANGUAGE_TAGS.get(language, {language})
+        tagged = [(tag, code) for tag, code in blocks if tag in tags]
+        blocks = tagged or [(tag, code) for tag, code in blocks if not tag]
+    return blocks
+
+
+def java_class_name(code):
+    """Java needs the file named after its public class."""
+    match = re.search(r"\bpublic\s+(?:final\s+|abstract\s+)*class\s+(\w+)", code) or re.search(r"\bclass\s+(\w+)", code)
+    return match.group(1) if match else "Main"
+
+
+def _limit_resources(limit_memory):
+    # Runs in the smoke-test child before exec (POSIX only)
+    if limit_memory:
+        resource.setrlimit(resource.RLIMIT_AS, (SMOKE_MEMORY_LIMIT, SMOKE_MEMORY_LIMIT))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (10 * 1024 * 1024, 10 * 1024 * 1024))
+    os.setsid()
+
+
+def _run(command, cwd, timeout, sandbox=False, limit_memory=True):
+    """Run a command with no stdin; returns (ok, output).
+
+    limit_memory caps the address space in the sandbox; JVM and V8 reserve far more than they use.
+    """
+    options = {}
+    if sandbox:
+        # A scratch directory, a minimal environment, capped memory and a wall-clock timeout.
+        # This contains accidents, not a determined attacker.
+        options["env"] = {"PATH": os.environ.get("PATH", ""), "SYSTEMROOT": os.environ.get("SYSTEMROOT", "")}
+        if resource is not None:
+            options["preexec_fn"] = lambda: _limit_resources(limit_memory)
+    try:
+        result = subprocess.run(
+            command, cwd=cwd, stdin=subprocess.DEVNULL, capture_output=True, text=True,
+            timeout=timeout, **options,
+        )
+    except subprocess.TimeoutExpired:
+        return False, f"timed out after {timeout:g} s"
+    except OSError as e:
+        return False, str(e)
+    output = (result.stderr or result.stdout).strip()
+    return result.returncode == 0, output[-MAX_ERROR_CHARS:]
+
+
+def check_program(language, code, smoke_test=False, timeout=10.0):
+    """Compile-check code (and optionally run it); returns (status, stage, message)."""
+    with tempfile.TemporaryDirectory(prefix="kai-check-") as workdir:
+        if language == "python":
+            try:
+                compile(code, "program.py", "exec")
+            except (SyntaxError, ValueError) as e:
+                return FAILED, "compile", f"{type(e).__name__}: {e}"
+            if not smoke_test:
+                return PASSED, "compile", ""
+            path = os.path.join(workdir, "program.py")
+            _write(path, code)
+            ok, output = _run([sys.executable, "-I", path], workdir, timeout, sandbox=True)
+            return (PASSED if ok else FAILED), "run", output
+
+        if language in ("c", "c++", "cpp"):
+            compiler = shutil.which("gcc" if language == "c" else "g++")
+            if not compiler:
+                return UNCHECKED, "compile", f"{'gcc' if language == 'c' else 'g++'} not found"
+            source = os.path.join(workdir, "program.c" if language == "c" else "program.cpp")
+            _write(source, code)
+            if not smoke_test:
+                ok, output = _run([compiler, "-fsyntax-only", source], workdir, timeout)
+                return (PASSED if ok else FAILED), "compile", output
+            binary = os.path.join(workdir, "program.exe" if os.name == "nt" else "program")
+            ok, output = _run([compiler, source, "-o", binary], workdir, timeout)
+            if not ok:
+                return FAILED, "compile", output
+            ok, output = _run([binary], workdir, timeout, sandbox=True)
+            return (PASSED if ok else FAILED), "run", output
+
+        if language == "java":
+            javac = shutil.which("javac")
+            if not javac:
+                return UNCHECKED, "compile", "javac not found"
+            class_name = java_class_name(code)
+            _write(os.path.join(workdir, f"{class_name}.java"), code)
+            ok, output = _run([javac, f"{class_name}.java"], workdir, timeout)
+            if not ok or not smoke_test:
+                return (PASSED if ok else FAILED), "compile", output
+            java = shutil.which("java")
+            if not java:
+                return PASSED, "compile", "java not found, not run"
+            ok, output = _run([java, "-cp", workdir, class_name], workdir, timeout, sandbox=True, limit_memory=False)
+            return (PASSED if ok else FAILED), "run", output
+
+        if language == "javascript":
+            node = shutil.which("node")
+            if not node:
+                return UNCHECKED, "compile", "node not found"
+            path = os.path.join(workdir, "program.js")
+            _write(path, code)
+            ok, output = _run([node, "--check", path], workdir, timeout)
+            if not ok or not smoke_test:
+                return (PASSED if ok else FAILED), "compile", output
+            ok, output = _run([node, path], workdir, timeout, sandbox=True, limit_memory=False)
+            return (PASSED if ok else FAILED), "run", output
+
+    return UNCHECKED, "compile", f"no checker for {language}"
+
+
+def _write(path, code):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(code)
+
+
+def save_program(directory, filename, code):
+    """Atomically write code into directory without clobbering a different file.
+
+    An existing file with identical content is reused; otherwise name_2, name_3... is
+    tried. The name is claimed with O_EXCL, then the content is moved in with os.replace.
+    Returns the path written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    base, extension = os.path.splitext(filename)
+    data = code.encode("utf-8")
+    for attempt in range(1, 1000):
+        path = os.path.join(directory, filename if attempt == 1 else f"{base}_{attempt}{extension}")
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return path
+            continue
+        os.close(fd)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".kai-", suffix=extension)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            os.remove(path)
+            raise
+        return path
+    raise FileExistsError(f"No free file name for {filename} in {directory}")
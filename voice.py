@@ -0,0 +1,233 @@
+import array
+import collections
+import math
+import queue
+import threading
+import time
+from recognizers import make_backend
+from tracing import tracer
+
+try:
+    import webrtcvad
+except ImportError:  # Optional: fall back to the energy detector alone
+    webrtcvad = None
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+
+def frame_energy(frame):
+    """RMS energy of a 16-bit mono PCM frame."""
+    samples = array.array("h", frame)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class VoiceActivityDetector:
+    """Energy-based speech detector with an adaptive noise floor (plus WebRTC VAD when installed).
+
+    The noise floor is calibrated once from the first frames and then keeps tracking the
+    ambient level from every non-speech frame, so no per-utterance calibration is needed.
+    """
+
+    def __init__(self, ratio=2.5, min_threshold=150.0, calibration_ms=500, aggressiveness=2, barge_in_ratio=3.0):
+        self.ratio = ratio
+        self.barge_in_ratio = barge_in_ratio
+        self.min_threshold = min_threshold
+        self.calibration_frames = calibration_ms // FRAME_MS
+        self.noise_floor = None
+        self._calibration = []
+        self.webrtc = webrtcvad.Vad(aggressiveness) if webrtcvad else None
+
+    @property
+    def calibrated(self):
+        return self.noise_floor is not None
+
+    def threshold(self):
+        return max(self.min_threshold, (self.noise_floor or 0.0) * self.ratio)
+
+    def is_speech(self, frame, strict=False):
+        """strict raises the bar (e.g. while Kai's own voice may be leaking into the mic)."""
+        energy = frame_energy(frame)
+        if not self.calibrated:
+            self._calibration.append(energy)
+            if len(self._calibration) >= self.calibration_frames:
+                self.noise_floor = sum(self._calibration) / len(self._calibration)
+            return False
+
+        speech = energy > self.threshold() * (self.barge_in_ratio if strict else 1.0)
+        if speech and self.webrtc:
+            speech = self.webrtc.is_speech(frame, SAMPLE_RATE)
+        if not speech and not strict:
+            # Track slow changes in the room noise
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * energy
+        return speech
+
+
+class VoiceCapture:
+    """Persistent microphone pipeline: one open stream, VAD segmentation and a recognition worker.
+
+    The capture thread streams the frames of each utterance (cut as soon as end_silence of
+    silence follows speech) through a queue to the recognition thread, which feeds them to
+    the speech backend ("google" or the offline "vosk"), reports partial hypotheses to
+    on_partial and the final transcript to on_transcript. on_status receives user-facing
+    messages; should_listen lets the caller mute capture (e.g. while Kai is speaking).
+    For barge-in, is_output_active tells the detector that Kai is talking (speech then has
+    to be clearly louder than the echo) and on_speech_start fires when the user starts.
+    When tracing is on, on_transcript runs with a trace holding the capture and recognition spans.
+    """
+
+    def __init__(self, on_transcript, on_partial=None, on_status=None, should_listen=None,
+                 is_output_active=None, on_speech_start=None, backend="google", language="en-in",
+                 start_frames=3, end_silence=0.6, max_phrase=8.0, pre_roll=0.3):
+        self.on_transcript = on_transcript
+        self.on_partial = on_partial or (lambda text: None)
+        self.on_status = on_status or print
+        self.should_listen = should_listen or (lambda: True)
+        self.is_output_active = is_output_active or (lambda: False)
+        self.on_speech_start = on_speech_start
+        self.backend_name = backend
+        self.language = language
+        self.backend = None  # Built once by warm_up() (or the recognition thread); speech SDKs load lazily
+        self._backend_lock = threading.Lock()
+        self.vad = VoiceActivityDetector()
+        self.start_frames = start_frames
+        self.end_frames = int(end_silence * 1000 / FRAME_MS)
+        self.max_frames = int(max_phrase * 1000 / FRAME_MS)
+        self.pre_roll_frames = int(pre_roll * 1000 / FRAME_MS)
+        self.audio_queue = queue.Queue(maxsize=2000)  # ("start" | "end", monotonic time) or ("frame", pcm)
+        self._microphone = None
+        self._source = None
+        self._running = threading.Event()
+        self._generation = 0  # Threads from an earlier start() exit when this changes
+        self._threads = []
+
+    def warm_up(self):
+        """Build the speech backend; a concurrent caller waits for the build already under way."""
+        with self._backend_lock:
+            if self.backend is None:
+                self.backend = make_backend(self.backend_name, SAMPLE_RATE, language=self.language)
+        return self.backend
+
+    def start(self):
+        """Open the microphone (once) and start capturing.
+
+        The backend isn't needed here: the recognition thread waits for it (see warm_up)
+        while captured audio queues up, so a model still loading never blocks the caller.
+        """
+        if self._running.is_set():
+            return
+        if self._source is None:
+            import speech_recognition as sr
+
+            self._microphone = sr.Microphone(sample_rate=SAMPLE_RATE, chunk_size=FRAME_SAMPLES)
+            self._source = self._microphone.__enter__()
+        self._generation += 1
+        self._running.set()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, args=(self._generation,), name="kai-capture", daemon=True),
+            threading.Thread(target=self._recognition_loop, args=(self._generation,), name="kai-recognize", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        self.on_status("🎤 Listening...")
+
+    def stop(self):
+        """Stop capturing; the stream stays open so the next start() is instant."""
+        self._running.clear()
+        try:
+            self.audio_queue.put_nowait(("stop", None))  # Wake the recognition worker
+        except queue.Full:
+            pass
+
+    def close(self):
+        self.stop()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        if self._microphone is not None:
+            self._microphone.__exit__(None, None, None)
+            self._microphone = self._source = None
+
+    def _active(self, generation):
+        return self._running.is_set() and generation == self._generation
+
+    def _emit(self, kind, data=None):
+        try:
+            self.audio_queue.put_nowait((kind, data))
+            return True
+        except queue.Full:
+            return False
+
+    def _capture_loop(self, generation):
+        stream = self._source.stream
+        pre_roll = collections.deque(maxlen=self.pre_roll_frames)
+        in_speech = False
+        length = voiced = silent = 0
+
+        while self._active(generation):
+            frame = stream.read(FRAME_SAMPLES)
+            if not self.should_listen():
+                if in_speech:
+                    self._emit("end", time.monotonic())
+                pre_roll.clear()
+                in_speech, length, voiced, silent = False, 0, 0, 0
+                continue
+
+            speech = self.vad.is_speech(frame, strict=self.is_output_active())
+            if not in_speech:
+                pre_roll.append(frame)
+                voiced = voiced + 1 if speech else 0
+                if voiced >= self.start_frames:
+                    # Start streaming, including the onset that triggered detection
+                    in_speech, length, silent = True, len(pre_roll), 0
+                    if self.on_speech_start:
+                        self.on_speech_start()
+                    self._emit("start", time.monotonic())
+                    for buffered in pre_roll:
+                        self._emit("frame", buffered)
+                continue
+
+            length += 1
+            silent = 0 if speech else silent + 1
+            if not self._emit("frame", frame):
+                self.on_status("⚠️ Recognition is falling behind, audio dropped.")
+            if silent >= self.end_frames or length >= self.max_frames:
+                self._emit("end", time.monotonic())
+                pre_roll.clear()
+                in_speech, voiced = False, 0
+
+    def _recognition_loop(self, generation):
+        import speech_recognition as sr
+
+        self.warm_up()
+        in_utterance = False
+        last_partial = None
+        speech_started = speech_ended = None
+        while self._active(generation):
+            kind, frame = self.audio_queue.get()
+            if kind == "start":
+                self.backend.start()
+                in_utterance, last_partial, speech_started = True, None, frame
+            elif kind == "frame" and in_utterance:
+                partial = self.backend.accept(frame)
+                if partial and partial != last_partial:
+                    last_partial = partial
+                    self.on_partial(partial.lower())
+            elif kind == "end" and in_utterance:
+                in_utterance, speech_ended = False, frame
+                self.on_status("🔍 Recognizing...")
+                try:
+                    text = self.backend.finish().lower()
+                except sr.UnknownValueError:
+                    self.on_status("❌ Could not understand audio.")
+                    continue
+                except sr.RequestError:
+                    self.on_status("⚠️ Speech recognition service unavailable.")
+                    continue
+                trace = tracer.new_trace(text, start=speech_started, source="voice")
+                tracer.record("voice.capture", speech_started, speech_ended, trace)
+                tracer.record("voice.recognize", speech_ended, time.monotonic(), trace, backend=self.backend_name)
+                with tracer.activate(trace):
+                    self.on_transcript(text)
@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+OPENWEATHER_URL = "http://api.openweathermap.org"
+
+WEATHER_TTL = 10 * 60  # Served straight from cache
+WEATHER_STALE_TTL = 60 * 60  # Served from cache while a refresh runs in the background
+
+
+class WeatherError(Exception):
+    """OpenWeatherMap answered, but not with weather (unknown city, bad key...)."""
+
+
+def normalize_city(city):
+    return " ".join(city.lower().split())
+
+
+class WeatherClient:
+    """OpenWeatherMap client with a pooled HTTP session and a stale-while-revalidate city cache.
+
+    base_url can point at a local stub server.
+    """
+
+    def __init__(self, api_key, base_url=OPENWEATHER_URL, ttl=WEATHER_TTL, stale_ttl=WEATHER_STALE_TTL,
+                 connect_timeout=3.0, read_timeout=5.0):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._http = None
+        self._cache = {}  # normalized city -> (fetched_at, temp, description)
+        self._refreshing = {}  # normalized city -> in-flight fetch task
+
+    def _session(self):
+        # Created lazily so the connection pool belongs to the loop that uses it
+        if self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+        return self._http
+
+    def warm_up(self):
+        self._session()
+
+    async def _fetch(self, city):
+        params = {"q": city, "appid": self.api_key, "units": "metric"}
+        response = await self._session().get("/data/2.5/weather", params=params)
+        data = response.json()
+        if str(data.get("cod")) != "200":
+            raise WeatherError(data.get("message", "Could not fetch weather details."))
+        return data["main"]["temp"], data["weather"][0]["description"]
+
+    def _refresh(self, key, city):
+        """Start (or join) the fetch for a city; identical requests share one call."""
+        task = self._refreshing.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(city))
+            self._refreshing[key] = task
+
+            def store(done):
+                self._refreshing.pop(key, None)
+                if not done.cancelled() and done.exception() is None:
+                    self._cache[key] = (time.monotonic(), *done.result())
+                elif not done.cancelled() and key in self._cache:
+                    # Background refresh of a stale entry; foreground callers see the error themselves
+                    print(f"Weather refresh for {city} failed: {done.exception()}")
+
+            task.add_done_callback(store)
+        return task
+
+    async def current(self, city):
+        """Return (temp, description) for a city, from cache when fresh enough."""
+        key = normalize_city(city)
+        cached = self._cache.get(key)
+        if cached:
+            age = time.monotonic() - cached[0]
+            if age < self.ttl:
+                return cached[1:]
+            if age < self.stale_ttl:
+                self._refresh(key, city)
+                return cached[1:]
+        return await asyncio.shield(self._refresh(key, city))
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None